@@ -4,14 +4,14 @@ Run with: python analytics_app.py
 """
 import json
 import os
-from flask import Flask, jsonify, render_template_string
-from dotenv import load_dotenv
+from flask import Flask, jsonify, render_template_string, request
 
-load_dotenv()
+from wban_rollups import ROLLUP_FILE, load_rollups, series
 
 app = Flask(__name__)
 
 ANALYTICS_FILE = "wban_analytics_data.json"
+MAX_SERIES_POINTS = 2000
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -98,6 +98,8 @@ HTML_TEMPLATE = """
 
     <div class="container mt-4">
         <div id="content">
+            <div class="alert alert-warning d-none" id="scan-status"></div>
+
             <!-- Summary -->
             <div class="row mb-4">
                 <div class="col-md-4 mb-3">
@@ -149,7 +151,7 @@ HTML_TEMPLATE = """
 
             <!-- 3 Months -->
             <div class="card mb-4">
-                <div class="card-header">Past 3 Months Activity</div>
+                <div class="card-header">Past 3 Months Activity <small id="partial-3m" class="d-none">(partial - still scanning)</small></div>
                 <div class="card-body">
                     <div class="row mb-3">
                         <div class="col-md-6">
@@ -168,6 +170,74 @@ HTML_TEMPLATE = """
                 </div>
             </div>
 
+            <!-- Swap Sizes -->
+            <div class="card mb-4">
+                <div class="card-header d-flex justify-content-between align-items-center">
+                    <span>Swap Size Distribution (wBAN)</span>
+                    <div class="btn-group btn-group-sm">
+                        <button class="btn btn-light" id="sizes-1m" onclick="renderSizes('1_month')">1 Month</button>
+                        <button class="btn btn-light" id="sizes-3m" onclick="renderSizes('3_months')">3 Months</button>
+                    </div>
+                </div>
+                <div class="card-body">
+                    <table class="table table-striped table-sm">
+                        <thead><tr><th>Chain</th><th>Swaps</th><th>p10</th><th>p25</th><th>Median</th><th>p75</th><th>p90</th><th>p99</th><th>Max</th></tr></thead>
+                        <tbody id="table-sizes"></tbody>
+                    </table>
+                </div>
+            </div>
+
+            <!-- Top Traders -->
+            <div class="card mb-4">
+                <div class="card-header d-flex justify-content-between align-items-center">
+                    <span>Top Traders (all chains)</span>
+                    <div class="btn-group btn-group-sm">
+                        <button class="btn btn-light" id="traders-1m" onclick="renderTraders('1_month')">1 Month</button>
+                        <button class="btn btn-light" id="traders-3m" onclick="renderTraders('3_months')">3 Months</button>
+                    </div>
+                </div>
+                <div class="card-body">
+                    <div class="row">
+                        <div class="col-md-6">
+                            <div class="stat-label mb-2">By Volume</div>
+                            <table class="table table-striped table-sm">
+                                <thead><tr><th>Rank</th><th>Address</th><th>Volume (wBAN)</th></tr></thead>
+                                <tbody id="table-traders-volume"></tbody>
+                            </table>
+                        </div>
+                        <div class="col-md-6">
+                            <div class="stat-label mb-2">By Swaps</div>
+                            <table class="table table-striped table-sm">
+                                <thead><tr><th>Rank</th><th>Address</th><th>Swaps</th></tr></thead>
+                                <tbody id="table-traders-count"></tbody>
+                            </table>
+                        </div>
+                    </div>
+                </div>
+            </div>
+
+            <!-- Activity chart -->
+            <div class="card mb-4">
+                <div class="card-header d-flex justify-content-between align-items-center">
+                    <span>Activity</span>
+                    <div class="form-inline">
+                        <select class="form-control form-control-sm mr-2" id="series-chain" onchange="renderSeries()"></select>
+                        <select class="form-control form-control-sm mr-2" id="series-metric" onchange="renderSeries()">
+                            <option value="volume">Volume (wBAN / hour)</option>
+                            <option value="swaps">Swaps / hour</option>
+                            <option value="liquidity">Liquidity (USD)</option>
+                        </select>
+                        <select class="form-control form-control-sm" id="series-range" onchange="renderSeries()">
+                            <option value="7">7 days</option>
+                            <option value="30" selected>30 days</option>
+                            <option value="90">90 days</option>
+                            <option value="0">All</option>
+                        </select>
+                    </div>
+                </div>
+                <div class="card-body"><canvas id="series-chart" height="90"></canvas></div>
+            </div>
+
             <!-- Liquidity -->
             <div class="card mb-4">
                 <div class="card-header">Current Liquidity by Chain</div>
@@ -190,6 +260,7 @@ HTML_TEMPLATE = """
         </div>
     </footer>
 
+    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"></script>
     <script>
         const data = {{ data | tojson }};
 
@@ -218,13 +289,29 @@ HTML_TEMPLATE = """
             return `<tr><td>${badge(i+1)}</td><td>${c.name}</td><td>${fmt(c['1_month'].swap_count)}</td><td>${fmt(c['1_month'].volume_wban)}</td><td>${fmtUSD(c['1_month'].volume_usd)}</td><td>${bar(pct)}</td></tr>`;
         }).join('');
 
+        // Scan progress: 1 month figures are published first, 3 months fill in per network
+        let scan = data.scan || {};
+        if (scan.stage && scan.stage !== 'complete') {
+            let status = document.getElementById('scan-status');
+            let pending = (scan.pending || []).join(', ');
+            status.textContent = scan.stage === '1_month'
+                ? 'Scanning the last month of every chain… figures update as each chain finishes.'
+                : scan.stage === '3_months'
+                ? `1 month figures are final. Extending to 3 months: ${pending || 'finishing'} still to scan.`
+                : `3 month history could not be completed for ${pending}; the next fetch rescans it.`;
+            status.classList.remove('d-none');
+            if (scan.stage !== 'incomplete') setTimeout(() => location.reload(), 60000);
+        }
+        if (data.totals['3_months'].complete === false) document.getElementById('partial-3m').classList.remove('d-none');
+
         // 3 Months
         document.getElementById('total-swaps-3m').textContent = fmt(data.totals['3_months'].swap_count);
         document.getElementById('total-volume-3m').textContent = fmt(data.totals['3_months'].volume_wban) + ' wBAN';
         let chains3m = Object.entries(data.chains).map(([k,v]) => ({id:k, ...v})).sort((a,b) => b['3_months'].swap_count - a['3_months'].swap_count);
         document.getElementById('table-3m').innerHTML = chains3m.map((c, i) => {
             let pct = data.totals['3_months'].swap_count ? (c['3_months'].swap_count / data.totals['3_months'].swap_count) * 100 : 0;
-            return `<tr><td>${badge(i+1)}</td><td>${c.name}</td><td>${fmt(c['3_months'].swap_count)}</td><td>${fmt(c['3_months'].volume_wban)}</td><td>${fmtUSD(c['3_months'].volume_usd)}</td><td>${bar(pct)}</td></tr>`;
+            let name = c['3_months'].complete === false ? `${c.name} <small class="text-muted">(last month only)</small>` : c.name;
+            return `<tr><td>${badge(i+1)}</td><td>${name}</td><td>${fmt(c['3_months'].swap_count)}</td><td>${fmt(c['3_months'].volume_wban)}</td><td>${fmtUSD(c['3_months'].volume_usd)}</td><td>${bar(pct)}</td></tr>`;
         }).join('');
 
         // Liquidity
@@ -234,6 +321,60 @@ HTML_TEMPLATE = """
             return `<tr><td>${badge(i+1)}</td><td>${c.name}</td><td>${fmt(c.liquidity.wban)}</td><td>${fmtUSD(c.liquidity.usd)}</td><td>${bar(pct)}</td></tr>`;
         }).join('');
 
+        // Swap sizes (quantiles from the per-pool sketches; "All chains" is their merge)
+        function renderSizes(window) {
+            let row = (name, w) => {
+                let q = (w && w.swap_size) || {};
+                return `<tr><td>${name}</td><td>${fmt(w && w.swap_count)}</td>` +
+                    ['p10', 'p25', 'p50', 'p75', 'p90', 'p99', 'max'].map(k => `<td>${fmt(q[k])}</td>`).join('') + '</tr>';
+            };
+            let chains = Object.values(data.chains).sort((a, b) => (b[window]?.swap_count || 0) - (a[window]?.swap_count || 0));
+            document.getElementById('table-sizes').innerHTML =
+                chains.map(c => row(c.name, c[window])).join('') + row('<b>All chains</b>', data.totals[window]);
+            document.getElementById('sizes-1m').classList.toggle('active', window === '1_month');
+            document.getElementById('sizes-3m').classList.toggle('active', window === '3_months');
+        }
+        renderSizes('1_month');
+
+        // Top traders (cross-chain, from the merged top-K sketches)
+        function shortAddr(a) { return `<code title="${a}">${a.slice(0, 8)}…${a.slice(-6)}</code>`; }
+        function renderTraders(window) {
+            let traders = (data.totals.top_traders || {})[window] || {by_volume: [], by_count: []};
+            document.getElementById('table-traders-volume').innerHTML = traders.by_volume.map((t, i) =>
+                `<tr><td>${badge(i+1)}</td><td>${shortAddr(t.address)}</td><td>${fmt(t.volume_wban)}</td></tr>`).join('');
+            document.getElementById('table-traders-count').innerHTML = traders.by_count.map((t, i) =>
+                `<tr><td>${badge(i+1)}</td><td>${shortAddr(t.address)}</td><td>${fmt(t.swap_count)}</td></tr>`).join('');
+            document.getElementById('traders-1m').classList.toggle('active', window === '1_month');
+            document.getElementById('traders-3m').classList.toggle('active', window === '3_months');
+        }
+        renderTraders('1_month');
+
+        // Activity chart (downsampled server-side from the hourly rollups)
+        let seriesChart = null;
+        document.getElementById('series-chain').innerHTML = '<option value="all">All chains</option>' +
+            Object.entries(data.chains).map(([k, c]) => `<option value="${k}">${c.name}</option>`).join('');
+        function renderSeries() {
+            let chain = document.getElementById('series-chain').value;
+            let metric = document.getElementById('series-metric').value;
+            let days = parseInt(document.getElementById('series-range').value);
+            let canvas = document.getElementById('series-chart');
+            let params = new URLSearchParams({chain, metric, points: Math.max(Math.floor(canvas.clientWidth / 2), 50)});
+            if (days) params.set('start', Math.floor(Date.now() / 1000) - days * 86400);
+            fetch('/api/series?' + params).then(r => r.json()).then(s => {
+                if (seriesChart) seriesChart.destroy();
+                if (typeof Chart === 'undefined' || !s.points) return;
+                seriesChart = new Chart(canvas, {
+                    type: 'line',
+                    data: {
+                        labels: s.points.map(p => new Date(p[0] * 1000).toLocaleString()),
+                        datasets: [{label: metric, data: s.points.map(p => p[1]), borderColor: '#e6c900', pointRadius: 0, borderWidth: 1.5}],
+                    },
+                    options: {animation: false, plugins: {legend: {display: false}}, scales: {x: {ticks: {maxTicksLimit: 8}}}},
+                });
+            });
+        }
+        renderSeries();
+
         function toggleDarkMode() {
             document.body.classList.toggle('dark-mode');
             localStorage.setItem('darkMode', document.body.classList.contains('dark-mode'));
@@ -251,17 +392,69 @@ def load_analytics():
     except FileNotFoundError:
         return {"error": "No data. Run 'python wban_analytics.py' first.", "chains": {}, "totals": {"1_month": {}, "3_months": {}}}
 
+def page_data(data):
+    """Data inlined into the page and served by /api/data: everything except the mergeable sketch state"""
+    chains = {
+        chain_id: {k: v for k, v in chain.items() if k != "sketches"}
+        for chain_id, chain in data.get("chains", {}).items()
+    }
+    return {**data, "chains": chains}
+
 @app.route("/")
 def index():
     data = load_analytics()
-    return render_template_string(HTML_TEMPLATE, data=data)
+    return render_template_string(HTML_TEMPLATE, data=page_data(data))
 
 @app.route("/api/data")
 def api_data():
-    return jsonify(load_analytics())
+    return jsonify(page_data(load_analytics()))
 
-if __name__ == "__main__":
-    host = os.getenv("HOST", "127.0.0.1")
-    port = int(os.getenv("PORT", 5001))
+@app.route("/api/sketches")
+def api_sketches():
+    """Mergeable sketch state (KLL, SpaceSaving, hourly volume) per pool, e.g. /api/sketches?chain=bsc"""
+    sketches = {chain_id: chain.get("sketches", {}) for chain_id, chain in load_analytics().get("chains", {}).items()}
+    chain = request.args.get("chain")
+    if chain is None:
+        return jsonify(sketches)
+    if chain not in sketches:
+        return jsonify({"error": f"Unknown chain {chain!r}"}), 404
+    return jsonify({chain: sketches[chain]})
+
+_rollups = {"mtime": None, "data": None}
+
+def cached_rollups():
+    """Rollups file, re-read only when a sync has rewritten it"""
+    try:
+        mtime = os.path.getmtime(ROLLUP_FILE)
+    except FileNotFoundError:
+        mtime = None
+    if _rollups["data"] is None or mtime != _rollups["mtime"]:
+        _rollups["data"] = load_rollups()
+        _rollups["mtime"] = mtime
+    return _rollups["data"]
+
+@app.route("/api/series")
+def api_series():
+    """Volume, swap count or liquidity over time, e.g. /api/series?chain=bsc&metric=volume&start=...&points=500"""
+    try:
+        start = request.args.get("start", type=int)
+        end = request.args.get("end", type=int)
+        points = min(request.args.get("points", 500, type=int), MAX_SERIES_POINTS)
+        return jsonify(series(cached_rollups(), request.args.get("chain", "all"),
+                              request.args.get("metric", "volume"), start, end, points))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        return jsonify({"error": f"Unknown chain {e.args[0]!r}"}), 404
+
+def main(host=None, port=None):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    host = host or os.getenv("HOST", "127.0.0.1")
+    port = port or int(os.getenv("PORT", 5001))
     print(f"wBAN Analytics running at http://{host}:{port}")
     app.run(host=host, port=port, debug=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from wban_analytics import POOLS, SWAP_EVENT_TOPIC, aggregate_swaps
+
+ROUTER = "0x" + "ab" * 20
+WALLET = "0x" + "cd" * 20
+
+
+def _log(block, sender, recipient, wban=1.0):
+    return {
+        "blockNumber": block, "logIndex": 0, "transactionHash": f"0x{block:064x}",
+        "topics": [SWAP_EVENT_TOPIC, "0x" + "0" * 24 + sender[2:], "0x" + "0" * 24 + recipient[2:]],
+        "data": "0x" + f"{int(wban * 10**18):064x}" + "0" * 192,
+    }
+
+
+def test_traders_are_recipients_and_senders_are_tracked_alongside():
+    other_pool = POOLS["bsc_usdc"]["lp_address"].lower()
+    logs = [_log(100, ROUTER, WALLET, 5.0), _log(101, ROUTER, other_pool, 3.0), _log(102, WALLET, WALLET, 1.0)]
+
+    traders = aggregate_swaps(logs, True, 0)["3_months"].top_traders()
+
+    assert [(t["address"], t["volume_wban"]) for t in traders["by_volume"]] == [(WALLET, 6.0)]
+    assert [(t["address"], t["swap_count"]) for t in traders["by_count"]] == [(WALLET, 2)]
+    assert [(t["address"], t["volume_wban"]) for t in traders["senders_by_volume"]] == [(ROUTER, 8.0), (WALLET, 1.0)]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+import analytics_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    chain = {"name": "BSC", "1_month": {"swap_count": 3}, "sketches": {"1_month": {"swap_count": 3}}}
+    with open(analytics_app.ANALYTICS_FILE, "w") as f:
+        json.dump({"chains": {"bsc": chain}, "totals": {}}, f)
+    return analytics_app.app.test_client()
+
+
+def test_api_data_leaves_out_sketch_state(client):
+    data = client.get("/api/data").get_json()
+
+    assert data["chains"]["bsc"]["1_month"] == {"swap_count": 3}
+    assert "sketches" not in data["chains"]["bsc"]
+
+
+def test_sketches_have_their_own_endpoint(client):
+    assert client.get("/api/sketches").get_json() == {"bsc": {"1_month": {"swap_count": 3}}}
+    assert client.get("/api/sketches?chain=bsc").get_json() == {"bsc": {"1_month": {"swap_count": 3}}}
+    assert client.get("/api/sketches?chain=nope").status_code == 404
+
+
+def test_api_series_slices_and_reports_errors(client):
+    hours = [h * 3600 for h in range(10)]
+    with open(analytics_app.ROLLUP_FILE, "w") as f:
+        json.dump({"pools": {"bsc": {"hourly": {"t": hours, "swap_count": [1] * 10,
+                                                 "volume_wban": [1.0] * 10}}}}, f)
+
+    ok = client.get("/api/series?chain=bsc&metric=swaps&start=3600&end=7200").get_json()
+    assert ok["points"] == [[3600, 1], [7200, 1]]
+    assert client.get("/api/series?points=2").status_code == 400
+    assert client.get("/api/series?metric=price").status_code == 400
+    assert client.get("/api/series?chain=nope").status_code == 404
@@ -0,0 +1,74 @@
+import pytest
+
+from wban_analytics import SWAP_EVENT_TOPIC, save_swap_logs
+from wban_arbitrage import find_arbitrage, match_swaps
+from wban_prices import INTERVAL, PriceTable
+
+HOUR = 1_700_000_000 - 1_700_000_000 % INTERVAL
+HEAD = 10_000_000
+
+
+def _swap(t, pool_id, side, price=1.0):
+    return (t, pool_id, side, price, 100.0, f"0x{pool_id}{t}")
+
+
+def test_match_swaps_pairs_opposite_sides_on_other_networks_within_tolerance():
+    bsc = [_swap(0, "bsc", "buy"), _swap(500, "bsc", "buy")]
+    bsc_usdc = [_swap(10, "bsc_usdc", "sell")]             # same network as bsc
+    polygon = [_swap(60, "polygon", "sell"), _swap(200, "polygon", "buy"), _swap(700, "polygon", "sell")]
+
+    pairs = [(a[1], a[0], b[1], b[0]) for a, b in match_swaps([iter(bsc), iter(bsc_usdc), iter(polygon)], 120)]
+
+    assert pairs == [("bsc", 0, "polygon", 60)]
+
+
+def test_match_swaps_pairs_every_swap_in_the_window():
+    buys = [_swap(t, "bsc", "buy") for t in (0, 30, 90)]
+    sells = [_swap(100, "polygon", "sell")]
+
+    pairs = [(a[0], b[0]) for a, b in match_swaps([iter(buys), iter(sells)], 80)]
+
+    assert pairs == [(30, 100), (90, 100)]
+
+
+def _log(block, amounts, timestamp=None):
+    log = {
+        "blockNumber": block, "logIndex": 0, "transactionHash": f"0x{block:064x}",
+        "topics": [SWAP_EVENT_TOPIC, "0x" + "0" * 64, "0x" + "0" * 63 + "1"],
+        "data": "0x" + "".join(f"{int(a * 10**18):064x}" for a in amounts),
+    }
+    if timestamp is not None:
+        log["blockTimestamp"] = timestamp
+    return log
+
+
+def test_find_arbitrage_prices_weth_at_the_swap_hour_and_skips_untimed_swaps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # bsc (wBAN is token0, BUSD): buy 1000 wBAN for 2 BUSD, $0.002 each
+    save_swap_logs("bsc", [_log(HEAD - 10, (0, 2, 1000, 0), timestamp=HOUR + 3590)])
+    # polygon (wBAN is token1, WETH): sell 1000 wBAN for 0.001 WETH in the next hour, when WETH is $2500
+    save_swap_logs("polygon", [
+        _log(HEAD - 20, (0, 1000, 0.001, 0), timestamp=HOUR + INTERVAL + 20),
+        _log(HEAD - 5, (0, 1000, 0.002, 0)),
+    ])
+    results = {"chains": {pool_id: {"current_block": HEAD} for pool_id in ("bsc", "polygon")}}
+    weth = PriceTable([HOUR, HOUR + INTERVAL], [2000.0, 2500.0], path=None, market="ETHUSDT")
+
+    report = find_arbitrage(results, tolerance=120, quote_prices={"WETH": weth})
+
+    assert report["matched_pairs"] == 1
+    pair = report["top_pairs"][0]
+    assert (pair["buy_pool"], pair["sell_pool"]) == ("bsc", "polygon")
+    assert pair["buy_price_usd"] == pytest.approx(0.002)
+    assert pair["sell_price_usd"] == pytest.approx(0.0025)
+    assert pair["gap_pct"] == pytest.approx(25.0)
+    assert pair["lag_seconds"] == 30
+
+
+def test_find_arbitrage_skips_pools_without_quote_prices(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_swap_logs("bsc", [_log(HEAD - 10, (0, 2, 1000, 0), timestamp=HOUR)])
+    save_swap_logs("polygon", [_log(HEAD - 20, (0, 1000, 0.001, 0), timestamp=HOUR + 20)])
+    results = {"chains": {pool_id: {"current_block": HEAD} for pool_id in ("bsc", "polygon")}}
+
+    assert find_arbitrage(results, quote_prices={})["matched_pairs"] == 0
@@ -0,0 +1,27 @@
+import os
+
+import wban_bench
+
+
+def test_stages_run_on_a_small_dataset():
+    report = wban_bench.run([200], ["aggregate", "totals"], trace_memory=False)
+
+    assert set(report["200"]) == {"aggregate", "totals"}
+    assert all(m["seconds"] > 0 and m["peak_bytes"] is None for m in report["200"].values())
+
+
+def test_compare_flags_only_measurements_over_tolerance():
+    baseline = {"1k": {"decode": {"seconds": 1.0, "peak_bytes": 100}, "render": {"seconds": 1.0, "peak_bytes": None}}}
+    report = {"1k": {"decode": {"seconds": 1.2, "peak_bytes": 200}, "render": {"seconds": 9.0, "peak_bytes": 5}},
+              "10k": {"decode": {"seconds": 5.0, "peak_bytes": 5}}}
+
+    assert wban_bench.compare(report, baseline, tolerance=0.25) == [
+        ("1k", "decode", "peak_bytes", 100, 200), ("1k", "render", "seconds", 1.0, 9.0)]
+
+
+def test_shipped_baseline_covers_the_default_sizes():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    baseline = wban_bench.load_baseline(os.path.join(root, wban_bench.BASELINE_FILE))
+
+    for size in wban_bench.DEFAULT_SIZES:
+        assert set(baseline[wban_bench.format_size(size)]) == set(wban_bench.STAGES)
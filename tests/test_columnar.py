@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import wban_columnar
+from wban_analytics import SWAP_EVENT_TOPIC, save_swap_logs
+
+HEAD = 1_000_000
+HEAD_TIME = int(datetime(2025, 10, 10, tzinfo=timezone.utc).timestamp())   # bsc: 3 s blocks
+
+
+def _logs(blocks):
+    return [{
+        "blockNumber": block,
+        "logIndex": 0,
+        "transactionHash": f"0x{block:064x}",
+        "topics": [SWAP_EVENT_TOPIC, "0x" + "0" * 64, "0x" + "0" * 63 + "1"],
+        "data": "0x" + f"{10**18:064x}" + "0" * 192,
+    } for block in blocks]
+
+
+def _results(head, head_time):
+    return {"chains": {"bsc": {"current_block": head, "head_timestamp": head_time}}}
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_swap_logs("bsc", _logs(range(0, HEAD + 1, 100)))
+    out = str(tmp_path / "export")
+    assert wban_columnar.export_columnar(_results(HEAD, HEAD_TIME), out) == 2
+    return out
+
+
+def _months(out):
+    return wban_columnar.load_manifest(out)["pools"]["bsc"]["months"]
+
+
+def test_first_export_writes_every_month(exported):
+    months = _months(exported)
+
+    assert sorted(months) == ["2025-09", "2025-10"]
+    assert sum(m["rows"] for m in months.values()) == HEAD // 100 + 1
+    assert wban_columnar.read_swaps(exported, "bsc").num_rows == HEAD // 100 + 1
+
+
+def test_unchanged_export_writes_nothing(exported):
+    assert wban_columnar.export_columnar(_results(HEAD, HEAD_TIME), exported) == 0
+
+
+def test_head_drift_never_rewrites_an_earlier_month_from_a_partial_read(exported):
+    before = _months(exported)
+    save_swap_logs("bsc", _logs(range(HEAD + 100, HEAD + 1001, 100)))
+
+    # The new head's time puts every estimate about 43 minutes earlier than last run,
+    # which moves the first October swaps back into September
+    wban_columnar.export_columnar(_results(HEAD + 1000, HEAD_TIME + 3000 - 2600), exported)
+
+    months = _months(exported)
+    assert months["2025-09"] == before["2025-09"]
+    assert months["2025-10"]["rows"] == before["2025-10"]["rows"] + 10
+    swaps = wban_columnar.read_swaps(exported, "bsc")
+    blocks = swaps["block_number"].to_pylist()
+    assert len(blocks) == len(set(blocks)) == HEAD // 100 + 11
+
+
+def test_full_export_starts_over(exported):
+    assert wban_columnar.export_columnar(_results(HEAD, HEAD_TIME), exported, full=True) == 2
+
+
+def test_parquet_export_reads_back_every_chain_with_daily_rollups(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+
+    monkeypatch.chdir(tmp_path)
+    save_swap_logs("bsc", _logs(range(0, 28801, 100)))          # one day of 3 s blocks
+    save_swap_logs("bsc_usdc", _logs(range(50, 28801, 100)))
+    out = str(tmp_path / "export")
+    results = _results(HEAD, HEAD_TIME)
+    results["chains"]["bsc"]["current_block"] = 28800
+    results["chains"]["bsc_usdc"] = dict(results["chains"]["bsc"])
+
+    wban_columnar.export_columnar(results, out, fmt="parquet")
+
+    swaps = wban_columnar.read_swaps(out, fmt="parquet")
+    assert swaps.num_rows == 289 + 288
+    assert set(swaps["chain"].to_pylist()) == {"bsc", "bsc_usdc"}
+    assert swaps.column_names[:len(wban_columnar.SWAP_COLUMNS)] == wban_columnar.SWAP_COLUMNS
+    daily = pq.read_table(f"{out}/rollups/chain=bsc/daily.parquet")
+    assert sum(daily["swap_count"].to_pylist()) == 289
+    assert sum(daily["volume_wban"].to_pylist()) == pytest.approx(289.0)
+
+
+def test_switching_format_rewrites_everything(exported):
+    assert wban_columnar.export_columnar(_results(HEAD, HEAD_TIME), exported, fmt="parquet") == 2
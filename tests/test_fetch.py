@@ -0,0 +1,110 @@
+import asyncio
+import types
+
+import pytest
+
+import wban_analytics
+from wban_analytics import POOLS, SWAP_EVENT_TOPIC, aligned_ranges, split_range
+
+
+class FakeEth:
+    """getLogs answering one Swap per block (without blockTimestamp), failing the calls numbered in `failures`"""
+
+    block_number = 10**6
+
+    def __init__(self, addresses, failures=()):
+        self.addresses = [addresses] if isinstance(addresses, str) else addresses
+        self.failures = set(failures)
+        self.calls = []
+        self.filters = []
+
+    def get_block(self, block):
+        return {"number": block, "timestamp": 1_700_000_000 + block * 12}
+
+    def get_logs(self, params):
+        self.calls.append((params["fromBlock"], params["toBlock"]))
+        self.filters.append(params)
+        if len(self.calls) in self.failures:
+            raise Exception("query timeout exceeded")
+        return [{
+            "blockNumber": block,
+            "logIndex": 0,
+            "address": self.addresses[block % len(self.addresses)],
+            "transactionHash": f"0x{block:064x}",
+            "topics": [SWAP_EVENT_TOPIC, "0x" + "0" * 64, "0x" + "0" * 63 + "1"],
+            "data": "0x" + "0" * 256,
+        } for block in range(params["fromBlock"], params["toBlock"] + 1)]
+
+
+@pytest.fixture
+def analytics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("WBAN_PRICE_SOURCE", "stored")
+    monkeypatch.setitem(wban_analytics.NETWORKS["ethereum"], "max_range", 700)
+    monkeypatch.setattr(wban_analytics.WBANAnalytics, "get_rpc_cache",
+                        lambda self, n: types.SimpleNamespace(mode="off", head=None))
+    return wban_analytics.WBANAnalytics()
+
+
+def _connect(monkeypatch, eth):
+    w3 = types.SimpleNamespace(eth=eth)
+    monkeypatch.setattr(wban_analytics.WBANAnalytics, "get_working_web3", lambda self, n: (w3, "https://a.test"))
+    monkeypatch.setattr(wban_analytics.WBANAnalytics, "get_web3_connection", lambda self, url, n: w3)
+
+
+def test_chunks_sit_on_the_grid_and_are_trimmed_to_the_range(analytics, monkeypatch):
+    eth = FakeEth(POOLS["ethereum"]["lp_address"])
+    _connect(monkeypatch, eth)
+
+    events = asyncio.run(analytics.fetch_swap_events("ethereum", 150, 2999))
+
+    assert eth.calls == [(0, 699), (700, 1399), (1400, 2099), (2100, 2799), (2800, 2999)]
+    assert [log["blockNumber"] for log in events["ethereum"]] == list(range(150, 3000))
+    assert all(log["blockTimestamp"] == 1_700_000_000 + log["blockNumber"] * 12 for log in events["ethereum"])
+
+
+def test_range_changes_do_not_keep_blocks_twice(analytics, monkeypatch):
+    # Two timeouts at block 1400 switch RPC, which resets max_range to 2000 (off the 700 grid)
+    eth = FakeEth(POOLS["ethereum"]["lp_address"], failures={3, 4})
+    _connect(monkeypatch, eth)
+
+    events = asyncio.run(analytics.fetch_swap_events("ethereum", 150, 4999))
+
+    assert eth.calls[4][0] < 1400    # the request after the switch re-covers kept blocks
+    assert [log["blockNumber"] for log in events["ethereum"]] == list(range(150, 5000))
+
+
+def test_aligned_ranges_cover_the_range_on_power_of_two_multiples():
+    ranges = aligned_ranges(150, 2999, 700)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == 2999
+    assert all(lo == prev_hi + 1 for (_, prev_hi), (lo, _) in zip(ranges, ranges[1:]))
+    for lo, hi in ranges[:-1]:
+        size = hi - lo + 1
+        assert size % 700 == 0 and (size // 700) & (size // 700 - 1) == 0 and lo % size == 0
+
+
+def test_split_range_prefers_grid_boundaries():
+    assert split_range(0, 2799, 700) == ((0, 1399), (1400, 2799))
+    assert split_range(0, 699, 700) == ((0, 349), (350, 699))
+
+
+def test_one_request_covers_every_pool_on_a_network(analytics, monkeypatch):
+    addresses = [POOLS["bsc"]["lp_address"], POOLS["bsc_usdc"]["lp_address"]]
+    eth = FakeEth(addresses)
+    _connect(monkeypatch, eth)
+
+    events = asyncio.run(analytics.fetch_swap_events("bsc", 0, 9999))
+
+    assert eth.calls == [(0, 4999), (5000, 9999)]
+    assert all(sorted(f["address"]) == sorted(addresses) and f["topics"] == [SWAP_EVENT_TOPIC] for f in eth.filters)
+    assert [log["blockNumber"] for log in events["bsc"]] == list(range(0, 10000, 2))
+    assert [log["blockNumber"] for log in events["bsc_usdc"]] == list(range(1, 10000, 2))
+
+
+def test_pool_registry_merges_network_settings():
+    pools = wban_analytics.network_pools("bsc")
+
+    assert list(pools) == ["bsc", "bsc_usdc"]
+    assert all(wban_analytics.CHAINS[pool_id]["block_time"] == wban_analytics.NETWORKS["bsc"]["block_time"]
+               for pool_id in pools)
@@ -0,0 +1,53 @@
+import asyncio
+
+from wban_hedge import MIN_HEDGE_DELAY, MIN_SAMPLES, Hedger, normalize_log
+
+
+def _hedger(monkeypatch, delays):
+    """Hedger over two fake endpoints answering after delays[url] seconds"""
+    async def post(self, client, rpc_url, params):
+        await asyncio.sleep(delays[rpc_url])
+        return [{"blockNumber": "0x1", "logIndex": "0x0", "url": rpc_url}], delays[rpc_url]
+
+    monkeypatch.setattr(Hedger, "_post", post)
+    hedger = Hedger("test", list(delays), budget=1.0)
+    hedger.latencies.extend([0.01] * MIN_SAMPLES)
+    return hedger
+
+
+def test_backup_win_records_the_primary_elapsed_time(monkeypatch):
+    hedger = _hedger(monkeypatch, {"https://slow.test": 5.0, "https://fast.test": 0.05})
+
+    async def run():
+        try:
+            return await hedger.get_logs("https://slow.test", {"fromBlock": "0x0", "toBlock": "0x1"})
+        finally:
+            await hedger.aclose()
+
+    logs = asyncio.run(run())
+
+    assert logs[0]["url"] == "https://fast.test" and logs[0]["blockNumber"] == 1
+    assert hedger.hedge_wins == 1
+    # Besides the backup's own 0.05 s, the primary counts as at least the time it was waited on
+    assert list(hedger.latencies)[-2] >= MIN_HEDGE_DELAY + 0.05
+    assert list(hedger.latencies)[-1] == 0.05
+
+
+def test_aclose_closes_the_client_and_allows_reuse():
+    hedger = Hedger("test", ["https://rpc.test"])
+
+    async def run():
+        client = hedger.get_client()
+        await hedger.aclose()
+        assert client.is_closed and hedger.client is None
+        assert not hedger.get_client().is_closed
+        await hedger.aclose()
+
+    asyncio.run(run())
+
+
+def test_normalize_log_converts_hex_fields():
+    log = normalize_log({"blockNumber": "0x10", "logIndex": "0x2", "blockTimestamp": "0x68000000", "data": "0x"})
+
+    assert (log["blockNumber"], log["logIndex"], log["blockTimestamp"]) == (16, 2, 0x68000000)
+    assert log["data"] == "0x"
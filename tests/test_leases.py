@@ -0,0 +1,70 @@
+import asyncio
+import time
+import types
+
+import wban_analytics
+import wban_leases
+
+
+def _blocking_web3(monkeypatch, delay):
+    """Point WBANAnalytics at a fake RPC whose getLogs blocks for `delay` seconds"""
+    class Eth:
+        block_number = 10**6
+
+        def get_logs(self, params):
+            time.sleep(delay)
+            return []
+
+    w3 = types.SimpleNamespace(eth=Eth())
+    monkeypatch.setattr(wban_analytics.WBANAnalytics, "get_working_web3", lambda self, n: (w3, "https://rpc.test"))
+    monkeypatch.setattr(wban_analytics.WBANAnalytics, "get_rpc_cache",
+                        lambda self, n: types.SimpleNamespace(mode="off", head=None))
+
+
+def test_job_longer_than_ttl_keeps_its_lease(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _blocking_web3(monkeypatch, delay=0.3)
+    renewals = []
+    renew = wban_leases.LeaseTable.renew
+    monkeypatch.setattr(wban_leases.LeaseTable, "renew",
+                        lambda self, job, ttl: renewals.append(job["id"]) or renew(self, job, ttl))
+
+    db = str(tmp_path / "leases.db")
+    table = wban_leases.LeaseTable(db)
+    # 15 chunks of arbitrum's max_range at 0.3 s each: about 4.5 s against a 0.6 s TTL
+    table.plan("arbitrum", 0, 1_499_999, 1_500_000)
+
+    started = time.time()
+    completed = asyncio.run(wban_leases.run_worker(db, owner="a", ttl=0.6))
+
+    assert time.time() - started > 0.6 * 3
+    assert completed == 1
+    assert len(renewals) >= 3
+    row = table.conn.execute("SELECT status, attempts FROM jobs").fetchone()
+    assert (row["status"], row["attempts"]) == ("done", 1)
+
+
+def test_reclaimed_job_is_not_committed_twice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _blocking_web3(monkeypatch, delay=0.05)
+    db = str(tmp_path / "leases.db")
+    table = wban_leases.LeaseTable(db)
+    table.plan("arbitrum", 0, 99_999, 100_000)
+
+    job = table.claim("a", ttl=-1)           # already expired
+    assert table.claim("b", ttl=60) is not None
+    assert table.complete(job, {}) is False  # the first owner's token no longer matches
+    assert table.renew(job, 60) is False
+
+
+def test_lost_lease_cancels_the_fetch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _blocking_web3(monkeypatch, delay=0.3)
+    monkeypatch.setattr(wban_leases.LeaseTable, "renew", lambda self, job, ttl: False)
+    db = str(tmp_path / "leases.db")
+    wban_leases.LeaseTable(db).plan("arbitrum", 0, 1_499_999, 1_500_000)
+
+    started = time.time()
+    assert asyncio.run(wban_leases.run_worker(db, owner="a", ttl=1.2)) == 0
+    # Abandoned at the first renewal (ttl/3) instead of fetching all 15 chunks (~4.5 s)
+    assert time.time() - started < 2
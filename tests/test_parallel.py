@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import wban_parallel
+from wban_analytics import OUTPUT_FILE, SWAP_EVENT_TOPIC, save_swap_logs
+from wban_prices import INTERVAL, PriceTable
+
+HEAD = 10_000_000
+NOW = 1_700_000_000 - 1_700_000_000 % INTERVAL
+
+
+def _logs(count):
+    """count bsc swaps of 1..count wBAN, one per block and 40 s apart, ending at HEAD"""
+    return [{
+        "blockNumber": HEAD - count + i, "logIndex": 0, "transactionHash": f"0x{i:064x}",
+        "topics": [SWAP_EVENT_TOPIC, "0x" + "0" * 64, "0x" + "0" * 24 + f"{i % 7 + 1:040x}"],
+        "data": "0x" + f"{(i + 1) * 10**18:064x}" + "0" * 192,
+        "blockTimestamp": NOW - (count - i) * 40,
+    } for i in range(count)]
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("WBAN_PRICE_SOURCE", raising=False)
+    save_swap_logs("bsc", _logs(500))
+    entry = {"name": "BSC", "network": "bsc", "current_block": HEAD, "head_timestamp": NOW,
+             "1_month": {}, "3_months": {"complete": True}}
+    with open(OUTPUT_FILE, "w") as f:
+        json.dump({"generated_at": None, "wban_price_usd": 0.0005, "chains": {"bsc": entry}}, f)
+    PriceTable([NOW - 10 * INTERVAL], [0.0005]).save()
+
+
+def test_static_price_source_values_reaggregated_volume(stored, monkeypatch):
+    monkeypatch.setenv("WBAN_PRICE_SOURCE", "static:0.002")
+
+    results = wban_parallel.reaggregate(workers=1, partitions=3)
+
+    volume = sum(range(1, 501))
+    assert results["wban_price_usd"] == 0.002
+    assert results["chains"]["bsc"]["3_months"]["volume_usd"] == pytest.approx(volume * 0.002)
+    assert PriceTable.load().closes == [0.0005]
+
+
+def test_stored_prices_are_used_by_default(stored):
+    results = wban_parallel.reaggregate(workers=1, partitions=3)
+
+    assert results["chains"]["bsc"]["3_months"]["volume_usd"] == pytest.approx(sum(range(1, 501)) * 0.0005)
+
+
+@pytest.mark.parametrize("workers,partitions", [(1, 1), (1, 7), (2, 13)])
+def test_sharded_aggregates_match_the_serial_pass(stored, workers, partitions):
+    from wban_analytics import CHAINS, aggregate_swaps, load_swap_logs, window_start_blocks
+
+    config = CHAINS["bsc"]
+    from_1m, from_3m = window_start_blocks(config, HEAD)
+    serial = aggregate_swaps(load_swap_logs("bsc"), config["wban_is_token0"], from_1m, from_3m, HEAD,
+                             (HEAD, NOW, config["block_time"]))
+
+    results = wban_parallel.reaggregate(workers=workers, partitions=partitions)
+
+    chain = results["chains"]["bsc"]
+    for window, aggregate in serial.items():
+        state = chain["sketches"][window]
+        assert state["swap_count"] == aggregate.swap_count == 500
+        assert state["volume_wban"] == pytest.approx(aggregate.volume_wban)
+        assert dict(state["hourly_volume"]) == pytest.approx(aggregate.hourly_volume)
+        # Ties may come out in either order, so compare per address
+        for ranking, expected in aggregate.top_traders().items():
+            assert {t["address"]: t for t in chain["top_traders"][window][ranking]} == \
+                {t["address"]: t for t in expected}
+        assert chain[window]["swap_size"]["min"] == 1.0 and chain[window]["swap_size"]["max"] == 500.0
+
+
+def test_shards_cover_every_line_once(stored):
+    from wban_analytics import load_swap_logs
+
+    shards = wban_parallel.plan_shards({"chains": {"bsc": {"current_block": HEAD, "head_timestamp": NOW}}}, 9)
+    blocks = [log["blockNumber"] for shard in shards for log in wban_parallel._shard_logs(*shard[1:4])]
+
+    assert len(shards) > 1
+    assert blocks == [log["blockNumber"] for log in load_swap_logs("bsc")]
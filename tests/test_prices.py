@@ -0,0 +1,132 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+import wban_analytics
+import wban_prices
+from wban_prices import INTERVAL, KLINE_LIMIT, PriceTable, StaticPriceSource
+
+NOW = 1_700_000_000 - 1_700_000_000 % INTERVAL
+
+
+class RecordingSource(StaticPriceSource):
+    """StaticPriceSource that remembers how many hours each refresh asked for"""
+
+    def __init__(self, prices, now=NOW):
+        super().__init__(prices, now)
+        self.requests = []
+
+    async def closes(self, limit):
+        self.requests.append(limit)
+        return await super().closes(limit)
+
+
+def _table(tmp_path, hours=(), closes=()):
+    return PriceTable(hours, closes, path=str(tmp_path / "prices.json"))
+
+
+def test_first_refresh_fetches_a_full_page(tmp_path):
+    table = _table(tmp_path)
+    source = RecordingSource(0.01)
+
+    assert asyncio.run(table.refresh(source, now=NOW)) == KLINE_LIMIT
+    assert source.requests == [KLINE_LIMIT]
+    assert table.hours[0] == NOW - (KLINE_LIMIT - 1) * INTERVAL
+    assert table.hours[-1] == NOW
+    assert PriceTable.load(table.path).hours == table.hours
+
+
+def test_refresh_fetches_only_missing_hours_and_the_last_one_again(tmp_path):
+    table = _table(tmp_path, [NOW - 5 * INTERVAL], [0.01])
+    source = RecordingSource(0.02)
+
+    # Mid-hour: still counts from the hour boundary
+    asyncio.run(table.refresh(source, now=NOW + 1234))
+
+    assert source.requests == [6]
+    assert table.hours == [NOW - i * INTERVAL for i in reversed(range(6))]
+    assert table.closes == [0.02] * 6
+
+
+def test_refresh_is_a_no_op_when_up_to_date(tmp_path):
+    table = _table(tmp_path, [NOW + INTERVAL], [0.01])
+    source = RecordingSource(0.02)
+
+    assert asyncio.run(table.refresh(source, now=NOW)) == 0
+    assert source.requests == []
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_value_uses_the_close_at_or_before_each_hour(tmp_path, monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setitem(sys.modules, "numpy", None)
+    table = _table(tmp_path, [NOW, NOW + INTERVAL, NOW + 3 * INTERVAL], [1.0, 2.0, 4.0])
+
+    # Before the first close, exact hits, a gap hour and past the last close
+    hours = [NOW - INTERVAL, NOW, NOW + INTERVAL, NOW + 2 * INTERVAL, NOW + 10 * INTERVAL]
+    assert table.prices_at(hours) == [1.0, 1.0, 2.0, 2.0, 4.0]
+    assert table.value(hours, [1, 1, 1, 1, 1]) == pytest.approx(10.0)
+    assert table.value([NOW + INTERVAL + 59], [2.5]) == pytest.approx(5.0)
+
+
+def test_value_of_nothing_is_zero(tmp_path):
+    assert _table(tmp_path).value([NOW], [1.0]) == 0.0
+    assert _table(tmp_path, [NOW], [1.0]).value([], []) == 0.0
+
+
+def test_price_source_specs(tmp_path):
+    closes = tmp_path / "closes.json"
+    closes.write_text(json.dumps([[NOW - INTERVAL, 0.5], [NOW, 0.6]]))
+
+    assert isinstance(wban_prices.price_source("coinex"), wban_prices.CoinExPriceSource)
+    assert wban_prices.price_source("stored") is None
+    assert wban_prices.price_source("static:0.25").prices == 0.25
+    assert wban_prices.price_source(f"static:{closes}").prices == [[NOW - INTERVAL, 0.5], [NOW, 0.6]]
+    with pytest.raises(ValueError):
+        wban_prices.price_source("static:")
+
+
+def _no_network(monkeypatch):
+    async def fail(self, limit):
+        raise AssertionError("CoinEx was called")
+
+    monkeypatch.setattr(wban_prices.CoinExPriceSource, "closes", fail)
+    monkeypatch.setattr("httpx.AsyncClient.get", fail)
+
+
+def test_replay_values_from_the_stored_table_without_refreshing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("WBAN_RPC_CACHE", "replay")
+    monkeypatch.delenv("WBAN_PRICE_SOURCE", raising=False)
+    _no_network(monkeypatch)
+    PriceTable([NOW - INTERVAL, NOW], [0.5, 0.6]).save()
+
+    analytics = wban_analytics.WBANAnalytics()
+    asyncio.run(analytics.refresh_price_table())
+
+    assert asyncio.run(analytics.get_wban_price()) == 0.6
+    assert analytics.price_table.hours == [NOW - INTERVAL, NOW]
+
+
+def test_static_source_does_not_touch_the_stored_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("WBAN_PRICE_SOURCE", "static:0.25")
+    _no_network(monkeypatch)
+
+    analytics = wban_analytics.WBANAnalytics()
+    asyncio.run(analytics.refresh_price_table())
+
+    assert asyncio.run(analytics.get_wban_price()) == 0.25
+    assert len(analytics.price_table) == KLINE_LIMIT
+    assert not (tmp_path / wban_prices.PRICE_FILE).exists()
+
+
+def test_hex_block_timestamps_are_bucketed_by_hour():
+    log = {"blockNumber": 100, "logIndex": 0, "topics": [wban_analytics.SWAP_EVENT_TOPIC],
+           "data": "0x" + f"{2 * 10**18:064x}" + "0" * 192, "blockTimestamp": hex(NOW + 59)}
+
+    windows = wban_analytics.aggregate_swaps([log], True, 50, clock=(200, NOW + 10**6, 12))
+
+    assert windows["1_month"].hourly_volume == {NOW: 2.0}
@@ -0,0 +1,60 @@
+import pytest
+
+from wban_rollups import lttb, series
+
+
+def _rollups():
+    hours = [h * 3600 for h in range(100)]
+    return {"bucket_seconds": 3600, "pools": {
+        "bsc": {"hourly": {"t": hours, "swap_count": [1] * 100, "volume_wban": [float(h) for h in range(100)]},
+                "liquidity": {"t": [0, 7200], "wban": [1, 2], "liquidity_usd": [10.0, 20.0]}},
+        "polygon": {"hourly": {"t": hours[::2], "swap_count": [2] * 50, "volume_wban": [1.0] * 50},
+                    "liquidity": {"t": [3600], "wban": [1], "liquidity_usd": [5.0]}},
+    }}
+
+
+def test_lttb_keeps_the_ends_and_the_spike():
+    xs = list(range(1000))
+    ys = [0.0] * 1000
+    ys[437] = 50.0
+
+    out_x, out_y = lttb(xs, ys, 20)
+
+    assert len(out_x) == 20
+    assert (out_x[0], out_x[-1]) == (0, 999)
+    assert 437 in out_x and max(out_y) == 50.0
+    assert out_x == sorted(out_x)
+
+
+def test_lttb_passes_short_series_through():
+    assert lttb([1, 2, 3], [4, 5, 6], 10) == ([1, 2, 3], [4, 5, 6])
+
+
+def test_series_slices_to_the_inclusive_range():
+    result = series(_rollups(), "bsc", "volume", start=10 * 3600, end=19 * 3600, points=500)
+
+    assert result["raw_points"] == 10
+    assert result["points"] == [[h * 3600, float(h)] for h in range(10, 20)]
+
+
+def test_series_downsamples_to_the_requested_points():
+    result = series(_rollups(), "bsc", "volume", points=10)
+
+    assert result["raw_points"] == 100 and len(result["points"]) == 10
+
+
+def test_all_chains_sum_per_hour_and_carry_liquidity_forward():
+    swaps = series(_rollups(), "all", "swaps", end=3 * 3600)["points"]
+    liquidity = series(_rollups(), "all", "liquidity")["points"]
+
+    assert swaps == [[0, 3], [3600, 1], [7200, 3], [10800, 1]]
+    assert liquidity == [[0, 10.0], [3600, 15.0], [7200, 25.0]]
+
+
+def test_series_rejects_bad_requests():
+    with pytest.raises(ValueError):
+        series(_rollups(), "bsc", "price")
+    with pytest.raises(ValueError):
+        series(_rollups(), "bsc", "volume", points=2)
+    with pytest.raises(KeyError):
+        series(_rollups(), "ethereum", "volume")
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import wban_ratelimit as ratelimit
+from wban_rpc_cache import RPCCache, RPCCacheMiss, cache_key, make_provider
+
+
+@pytest.fixture
+def throttling_server():
+    """Local RPC answering every request with 429 and Retry-After: 30"""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            hits.append(self.path)
+            self.send_response(429)
+            self.send_header("Retry-After", "30")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+
+def test_a_throttled_request_is_sent_once_and_blocks_the_bucket(throttling_server):
+    url, hits = throttling_server
+    provider = make_provider(url, None, request_kwargs={"timeout": 5})
+
+    with pytest.raises(Exception):
+        provider.make_request("eth_blockNumber", [])
+
+    assert len(hits) == 1
+    assert ratelimit.get_bucket(url).blocked_until > time.monotonic() + 20
+
+
+def _logs_params(to_block):
+    return [{"fromBlock": hex(0), "toBlock": hex(to_block), "address": ["0xabc"], "topics": ["0xdef"]}]
+
+
+def test_cache_mode_stores_only_finalized_responses(tmp_path):
+    cache = RPCCache("bsc", "cache", directory=str(tmp_path), finality_blocks=10)
+    cache.put("eth_blockNumber", [], hex(100))
+
+    cache.put("eth_getLogs", _logs_params(90), ["finalized"])
+    cache.put("eth_getLogs", _logs_params(95), ["near the head"])
+    cache.put("eth_getBlockByNumber", [hex(50), False], {"timestamp": 1})
+
+    fresh = RPCCache("bsc", "cache", directory=str(tmp_path), finality_blocks=10)
+    assert fresh.get("eth_getLogs", _logs_params(90)) == ["finalized"]
+    assert fresh.get("eth_getLogs", _logs_params(95)) is None
+    assert fresh.get("eth_getBlockByNumber", [hex(50), False]) == {"timestamp": 1}
+    assert fresh.get("eth_blockNumber", []) is None
+
+
+def test_record_then_replay_serves_everything_and_misses_raise(tmp_path):
+    record = RPCCache("bsc", "record", directory=str(tmp_path))
+    record.put("eth_blockNumber", [], hex(100))
+    record.put("eth_getLogs", _logs_params(100), ["head"])
+    assert record.get("eth_getLogs", _logs_params(100)) is None    # record always goes to the network
+
+    replay = RPCCache("bsc", "replay", directory=str(tmp_path))
+    assert replay.get("eth_blockNumber", []) == hex(100)
+    assert replay.get("eth_getLogs", _logs_params(100)) == ["head"]
+    with pytest.raises(RPCCacheMiss):
+        replay.get("eth_getLogs", _logs_params(99))
+
+
+def test_keys_depend_on_network_and_exact_params():
+    key = cache_key("bsc", "eth_getLogs", _logs_params(90))
+
+    assert key == cache_key("bsc", "eth_getLogs", json.loads(json.dumps(_logs_params(90))))
+    assert key != cache_key("polygon", "eth_getLogs", _logs_params(90))
+    assert key != cache_key("bsc", "eth_getLogs", _logs_params(91))
+
+
+def test_provider_answers_cached_requests_without_the_network(tmp_path):
+    cache = RPCCache("bsc", "replay", directory=str(tmp_path))
+    RPCCache("bsc", "record", directory=str(tmp_path)).put("eth_chainId", [], "0x38")
+
+    # Nothing listens on this port; a network call would fail
+    provider = make_provider("http://127.0.0.1:9", cache)
+
+    assert provider.make_request("eth_chainId", [])["result"] == "0x38"
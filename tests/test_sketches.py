@@ -0,0 +1,98 @@
+import json
+import random
+
+from wban_sketches import KLLSketch, SpaceSaving
+
+
+def _weighted_stream(seed, n=20_000):
+    """Zipf-ish trader weights: a few heavy keys over a long tail"""
+    rng = random.Random(seed)
+    return [(f"k{int(rng.paretovariate(1.1))}", rng.uniform(0.5, 2.0)) for _ in range(n)]
+
+
+def _exact(stream):
+    totals = {}
+    for key, weight in stream:
+        totals[key] = totals.get(key, 0.0) + weight
+    return totals
+
+
+def _within(weight, error, exact, slack=1e-9):
+    """SpaceSaving's guarantee: weight - error <= exact <= weight (up to float summation order)"""
+    return weight - error - slack * weight <= exact <= weight + slack * weight
+
+
+def test_space_saving_bounds_hold_for_every_tracked_key():
+    stream = _weighted_stream(1)
+    sketch = SpaceSaving(50)
+    for key, weight in stream:
+        sketch.add(key, weight)
+    exact = _exact(stream)
+
+    assert len(sketch) == 50
+    for key, weight, error in sketch.top(50):
+        assert _within(weight, error, exact[key])
+
+
+def test_space_saving_merge_finds_the_heavy_hitters_of_both_halves():
+    stream = _weighted_stream(2)
+    left, right = SpaceSaving(50), SpaceSaving(50)
+    for i, (key, weight) in enumerate(stream):
+        (left if i % 2 else right).add(key, weight)
+    merged = SpaceSaving.from_state(json.loads(json.dumps(left.to_state()))).merge(right)
+    exact = _exact(stream)
+
+    heaviest = sorted(exact, key=exact.get, reverse=True)[:5]
+    assert [key for key, _, _ in merged.top(5)] == heaviest
+    for key, weight, error in merged.top(50):
+        assert _within(weight, error, exact[key])
+
+
+def _rank_error(values, sketch, qs):
+    """Largest |rank(estimate) - q| over qs, as a fraction of the stream"""
+    ordered = sorted(values)
+    worst = 0.0
+    for q, estimate in zip(qs, sketch.quantiles(qs)):
+        rank = sum(1 for v in ordered if v <= estimate) / len(ordered)
+        worst = max(worst, abs(rank - q))
+    return worst
+
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def test_kll_quantiles_stay_within_rank_error_in_bounded_memory():
+    rng = random.Random(3)
+    values = [rng.lognormvariate(7, 2) for _ in range(50_000)]
+    sketch = KLLSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == len(values)
+    assert (sketch.min, sketch.max) == (min(values), max(values))
+    assert sketch._size() < 3 * sketch.k + 2 * len(sketch.compactors)
+    assert _rank_error(values, sketch, QS) < 0.02
+
+
+def test_kll_merge_of_shards_matches_one_sketch():
+    rng = random.Random(4)
+    values = [rng.expovariate(1 / 500) for _ in range(40_000)]
+    shards = [KLLSketch() for _ in range(8)]
+    for i, value in enumerate(values):
+        shards[i % 8].add(value)
+    merged = KLLSketch()
+    for shard in shards:
+        merged.merge(KLLSketch.from_state(json.loads(json.dumps(shard.to_state()))))
+
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (min(values), max(values))
+    assert merged._size() < 3 * merged.k + 2 * len(merged.compactors)
+    assert _rank_error(values, merged, QS) < 0.02
+
+
+def test_kll_empty_and_merging_empty():
+    sketch = KLLSketch().merge(KLLSketch())
+
+    assert sketch.quantiles([0.5]) == [None]
+    sketch.add(2.0)
+    assert sketch.merge(KLLSketch()).quantiles([0, 0.5, 1]) == [2.0, 2.0, 2.0]
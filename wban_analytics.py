@@ -3,18 +3,17 @@ wBAN Analytics - Fetch historical swap data and liquidity across chains
 Saves progress incrementally to avoid losing data
 """
 import asyncio
-import httpx
 import json
 import time
 from datetime import datetime, timezone
-from web3 import Web3
 import logging
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from wban_prices import PriceTable, hour_of, load_quote_price_tables, price_source
+
+# web3, httpx and dotenv are imported where they are used so that commands
+# which only read the saved data (summary, export, serve) start quickly.
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("wBAN_analytics")
 
 # Uniswap V2 Swap event signature
@@ -22,11 +21,15 @@ SWAP_EVENT_TOPIC = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d1308401
 
 OUTPUT_FILE = "wban_analytics_data.json"
 
-# Chain configurations with LOTS of RPCs
-CHAINS = {
+# Raw Swap logs are kept per chain (one JSON object per line, sorted by block)
+# so history can be re-aggregated without hitting the RPCs again.
+SWAP_LOG_DIR = "wban_swap_logs"
+
+# Networks with LOTS of RPCs. Every pool on a network is scanned with the
+# same eth_getLogs calls, so RPCs and block times live here, not per pool.
+NETWORKS = {
     "ethereum": {
         "name": "Ethereum",
-        "lp_address": "0x1f249F8b5a42aa78cc8a2b66EE0bb015468a5f43",
         "rpc_urls": [
             "https://eth.drpc.org",
             "https://eth-pokt.nodies.app",
@@ -37,13 +40,11 @@ CHAINS = {
             "https://cloudflare-eth.com",
         ],
         "block_time": 12,
-        "wban_is_token0": False,
-        "quote_token": "WETH",
-        "quote_decimals": 18,
+        "max_range": 5000,
+        "finality_blocks": 64,
     },
     "polygon": {
         "name": "Polygon",
-        "lp_address": "0xb556feD3B348634a9A010374C406824Ae93F0CF8",
         "rpc_urls": [
             "https://polygon.drpc.org",
             "https://polygon.meowrpc.com",
@@ -53,13 +54,11 @@ CHAINS = {
             "https://rpc.ankr.com/polygon",
         ],
         "block_time": 2,
-        "wban_is_token0": False,
-        "quote_token": "WETH",
-        "quote_decimals": 18,
+        "max_range": 5000,
+        "finality_blocks": 256,
     },
     "bsc": {
         "name": "BSC",
-        "lp_address": "0x351A295AfBAB020Bc7eedcB7fd5A823c01A95Fda",
         "rpc_urls": [
             "https://bsc.drpc.org",
             "https://bsc-pokt.nodies.app",
@@ -80,39 +79,11 @@ CHAINS = {
             "https://rpc.ankr.com/bsc",
         ],
         "block_time": 3,
-        "wban_is_token0": True,
-        "quote_token": "BUSD",
-        "quote_decimals": 18,
-    },
-    "bsc_usdc": {
-        "name": "BSC (USDC)",
-        "lp_address": "0x76B1aB2f84bE3C4a103ef1d2C2a74145414FFA49",
-        "rpc_urls": [
-            "https://bsc.drpc.org",
-            "https://bsc-pokt.nodies.app",
-            "https://1rpc.io/bnb",
-            "https://bsc.meowrpc.com",
-            "https://bsc-dataseed4.bnbchain.org",
-            "https://bsc-dataseed1.defibit.io",
-            "https://bsc-dataseed2.ninicoin.io",
-            "https://binance.llamarpc.com",
-            "https://bsc.rpc.blxrbdn.com",
-            "https://bsc-mainnet.nodereal.io/v1/64a9df0874fb4a93b9d0a3849de012d3",
-            "https://rpc-bsc.48.club",
-            "https://bsc.blockrazor.xyz",
-            "https://bsc-dataseed1.binance.org",
-            "https://bsc-dataseed2.binance.org",
-            "https://bsc.publicnode.com",
-            "https://rpc.ankr.com/bsc",
-        ],
-        "block_time": 3,
-        "wban_is_token0": False,
-        "quote_token": "USDC",
-        "quote_decimals": 18,
+        "max_range": 5000,
+        "finality_blocks": 15,
     },
     "arbitrum": {
         "name": "Arbitrum",
-        "lp_address": "0xBD80923830B1B122dcE0C446b704621458329F1D",
         "rpc_urls": [
             "https://endpoints.omniatech.io/v1/arbitrum/one/public",
             "https://1rpc.io/arb",
@@ -129,12 +100,72 @@ CHAINS = {
             "https://arbitrum.drpc.org",
         ],
         "block_time": 0.25,
+        "max_range": 100000,
+        "finality_blocks": 4800,
+    },
+}
+
+# wBAN pools, keyed by the id used in the output file. Add a pool by listing
+# it here with its network; it is picked up by that network's scan.
+POOLS = {
+    "ethereum": {
+        "network": "ethereum",
+        "name": "Ethereum",
+        "lp_address": "0x1f249F8b5a42aa78cc8a2b66EE0bb015468a5f43",
+        "wban_is_token0": False,
+        "quote_token": "WETH",
+        "quote_decimals": 18,
+    },
+    "polygon": {
+        "network": "polygon",
+        "name": "Polygon",
+        "lp_address": "0xb556feD3B348634a9A010374C406824Ae93F0CF8",
+        "wban_is_token0": False,
+        "quote_token": "WETH",
+        "quote_decimals": 18,
+    },
+    "bsc": {
+        "network": "bsc",
+        "name": "BSC",
+        "lp_address": "0x351A295AfBAB020Bc7eedcB7fd5A823c01A95Fda",
+        "wban_is_token0": True,
+        "quote_token": "BUSD",
+        "quote_decimals": 18,
+    },
+    "bsc_usdc": {
+        "network": "bsc",
+        "name": "BSC (USDC)",
+        "lp_address": "0x76B1aB2f84bE3C4a103ef1d2C2a74145414FFA49",
+        "wban_is_token0": False,
+        "quote_token": "USDC",
+        "quote_decimals": 18,
+    },
+    "arbitrum": {
+        "network": "arbitrum",
+        "name": "Arbitrum",
+        "lp_address": "0xBD80923830B1B122dcE0C446b704621458329F1D",
         "wban_is_token0": False,
         "quote_token": "WETH",
         "quote_decimals": 18,
     },
 }
 
+# Per-pool view with the network settings merged in (block_time, rpc_urls, ...)
+CHAINS = {
+    pool_id: {**NETWORKS[pool["network"]], **pool}
+    for pool_id, pool in POOLS.items()
+}
+
+
+# Our own pairs: a swap routed on into one of them is a hop, not a trader
+LP_ADDRESSES = {pool["lp_address"].lower() for pool in POOLS.values()}
+
+
+def network_pools(network_id):
+    """Pools tracked on a network, in registry order"""
+    return {pool_id: pool for pool_id, pool in POOLS.items() if pool["network"] == network_id}
+
+
 LP_ABI = [
     {
         "constant": True,
@@ -151,6 +182,14 @@ LP_ABI = [
 ]
 
 
+def setup_logging():
+    """Configure logging and load .env; called by entry points, not at import"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
 def load_existing_data():
     """Load existing analytics data if available"""
     try:
@@ -173,6 +212,369 @@ def save_data(results):
     logger.info(f"Data saved to {OUTPUT_FILE}")
 
 
+def _hex(value):
+    """Render bytes/HexBytes/str as a 0x-prefixed hex string"""
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value if value.startswith("0x") else "0x" + value
+
+
+def compact_log(log):
+    """Keep only the fields of a Swap log needed to re-aggregate it later"""
+    record = {
+        "blockNumber": int(log["blockNumber"], 16) if isinstance(log["blockNumber"], str) else log["blockNumber"],
+        "logIndex": int(log["logIndex"], 16) if isinstance(log["logIndex"], str) else log["logIndex"],
+        "transactionHash": _hex(log["transactionHash"]),
+        "topics": [_hex(t) for t in log["topics"]],
+        "data": _hex(log["data"]),
+    }
+    if log.get("blockTimestamp") is not None:
+        ts = log["blockTimestamp"]
+        record["blockTimestamp"] = int(ts, 16) if isinstance(ts, str) else ts
+    return record
+
+
+def swap_log_path(chain_id):
+    return os.path.join(SWAP_LOG_DIR, f"{chain_id}.jsonl")
+
+
+def load_swap_logs(chain_id):
+    """Yield stored Swap logs for a chain in block order"""
+    try:
+        with open(swap_log_path(chain_id), "r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+
+def save_swap_logs(chain_id, logs):
+    """Merge logs into the chain's stored history, de-duplicated by position"""
+    merged = {(r["blockNumber"], r["logIndex"]): r for r in load_swap_logs(chain_id)}
+    for log in logs:
+        record = compact_log(log)
+        merged[(record["blockNumber"], record["logIndex"])] = record
+
+    os.makedirs(SWAP_LOG_DIR, exist_ok=True)
+    path = swap_log_path(chain_id)
+    with open(path + ".tmp", "w") as f:
+        for key in sorted(merged):
+            f.write(json.dumps(merged[key], separators=(",", ":")) + "\n")
+    os.replace(path + ".tmp", path)
+    logger.info(f"{chain_id}: {len(merged)} swaps stored in {path}")
+
+
+def decode_swap_volume(data, wban_is_token0):
+    """wBAN amount (in + out) moved by a Swap event's data field"""
+    if isinstance(data, (bytes, bytearray)):
+        data = bytes(data).hex()
+    if data.startswith("0x"):
+        data = data[2:]
+
+    if wban_is_token0:
+        amount_in = int(data[0:64], 16)
+        amount_out = int(data[128:192], 16)
+    else:
+        amount_in = int(data[64:128], 16)
+        amount_out = int(data[192:256], 16)
+    return amount_in / 10**18 + amount_out / 10**18
+
+
+def decode_swap_amounts(data, wban_is_token0, quote_decimals):
+    """(wban_in, wban_out, quote_in, quote_out) of a Swap event's data field, in token units"""
+    if isinstance(data, (bytes, bytearray)):
+        data = bytes(data).hex()
+    if data.startswith("0x"):
+        data = data[2:]
+
+    amounts = [int(data[i:i + 64], 16) for i in range(0, 256, 64)]
+    amount0_in, amount1_in, amount0_out, amount1_out = amounts
+    if wban_is_token0:
+        wban_in, wban_out, quote_in, quote_out = amount0_in, amount0_out, amount1_in, amount1_out
+    else:
+        wban_in, wban_out, quote_in, quote_out = amount1_in, amount1_out, amount0_in, amount0_out
+    quote_unit = 10**quote_decimals
+    return wban_in / 10**18, wban_out / 10**18, quote_in / quote_unit, quote_out / quote_unit
+
+
+def estimate_block_timestamp(block, head_block, head_timestamp, block_time):
+    """Unix time of a block, extrapolated back from the head at the network's block time"""
+    return int(head_timestamp - (head_block - block) * block_time)
+
+
+def swap_timestamp(log, head_block, head_timestamp, block_time):
+    """The log's own blockTimestamp when the RPC supplied one, else an estimate"""
+    ts = log.get("blockTimestamp")
+    if ts is not None:
+        # web3 passes blockTimestamp through unformatted, as a hex string
+        return int(ts, 16) if isinstance(ts, str) else ts
+    return estimate_block_timestamp(log["blockNumber"], head_block, head_timestamp, block_time)
+
+
+def chain_head_timestamp(results, chain_data):
+    """head_timestamp of a pool's entry, falling back to the file's generated_at"""
+    if chain_data.get("head_timestamp"):
+        return chain_data["head_timestamp"]
+    generated_at = results.get("generated_at")
+    if generated_at:
+        return int(datetime.fromisoformat(generated_at).timestamp())
+    return int(time.time())
+
+
+def window_start_blocks(config, current_block):
+    """First block of the 1 month and 3 month windows ending at current_block"""
+    blocks_per_day = int(86400 / config["block_time"])
+    from_block_1m = max(1, current_block - blocks_per_day * 30)
+    from_block_3m = max(1, current_block - blocks_per_day * 90)
+    return from_block_1m, from_block_3m
+
+
+# Range planning: a network whose pools are expected to hold at most SPARSE_MAX_SWAPS
+# swaps in the requested range (from the last run's swap density) is fetched by asking
+# for the whole range and bisecting only where the provider refuses or caps the answer.
+SPARSE_MAX_SWAPS = 1000
+LOG_RESULT_CAP = 10000     # a response this large may have been truncated by the provider
+BISECT_MAX_THROTTLES = 3   # then hand over to the chunked scan, which can switch RPC
+RANGE_ERROR_MARKERS = ("limit", "range", "exceeded", "too many", "timeout", "more than", "results")
+
+
+def has_complete_data(results, pool_id):
+    """True if a pool has an entry whose 3 month window was fully scanned"""
+    chain_data = results.get("chains", {}).get(pool_id)
+    return chain_data is not None and chain_data.get("3_months", {}).get("complete", True)
+
+
+def network_swap_density(results, network_id):
+    """Swaps per block over the 3 month window for a network's pools, or None without prior data
+
+    A 3 month entry that is still partial only covers the last month, so the
+    1 month window is used for it instead.
+    """
+    swaps = blocks = 0
+    for pool_id in network_pools(network_id):
+        chain_data = results.get("chains", {}).get(pool_id)
+        if not chain_data or "3_months" not in chain_data:
+            return None
+        from_block_1m, from_block_3m = window_start_blocks(NETWORKS[network_id], chain_data["current_block"])
+        if chain_data["3_months"].get("complete", True):
+            window, from_block = "3_months", from_block_3m
+        else:
+            window, from_block = "1_month", from_block_1m
+        swaps += chain_data[window]["swap_count"]
+        blocks = max(blocks, chain_data["current_block"] - from_block)
+    return swaps / blocks if blocks else None
+
+
+def aligned_ranges(from_block, to_block, unit):
+    """Cover [from_block, to_block] with ranges on a fixed grid of `unit` blocks
+
+    Each range is unit * 2**k blocks starting at a multiple of its own size,
+    so the same finalized range is requested (and cached) on every run even
+    though the window start moves. The first range may start before
+    from_block; the last one is cut at to_block.
+    """
+    ranges = []
+    start = from_block // unit * unit
+    last = to_block // unit * unit + unit - 1
+    while start <= to_block:
+        size = unit
+        while start % (size * 2) == 0 and start + size * 2 - 1 <= last:
+            size *= 2
+        ranges.append((start, min(start + size - 1, to_block)))
+        start += size
+    return ranges
+
+
+def split_range(lo, hi, unit):
+    """Halve [lo, hi], on a `unit` boundary when there is one near the middle"""
+    boundary = (lo + hi + 1) // 2 // unit * unit
+    mid = boundary - 1 if lo < boundary <= hi else (lo + hi) // 2
+    return (lo, mid), (mid + 1, hi)
+
+
+def is_range_error(exc):
+    """True if a getLogs error means the range (or its result) was too large"""
+    import wban_ratelimit as ratelimit
+
+    if ratelimit.throttle_retry_after(exc)[0]:
+        return False
+    message = str(exc).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+WINDOWS = ("1_month", "3_months")
+
+# Top traders: report TOP_K, tracked with a SpaceSaving sketch of TOP_K_CAPACITY
+# counters per pool and window so memory stays flat over any history length.
+# Traders are ranked by recipient: the `sender` topic is whoever called the pair,
+# nearly always a router, so ranking it lists routers rather than wallets. Senders
+# are tracked alongside by volume to show which routers and aggregators carry the
+# flow. A multi-hop swap's recipient can still be the next pair in the route;
+# hops into our own pools are left out.
+TOP_K = 10
+TOP_K_CAPACITY = 200
+
+# Swap-size distribution reported per window, from a KLL sketch per pool and window
+SWAP_SIZE_QUANTILES = {"p10": 0.1, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9, "p99": 0.99}
+
+
+def topic_address(log, index):
+    """Address in an indexed Swap topic (1 = sender, 2 = to), lower-case, or None"""
+    topics = log["topics"]
+    if len(topics) <= index:
+        return None
+    return "0x" + _hex(topics[index])[-40:].lower()
+
+
+def swap_trader(log):
+    """Recipient of a Swap (the indexed `to` topic), None when it is one of our pools"""
+    recipient = topic_address(log, 2)
+    return None if recipient in LP_ADDRESSES else recipient
+
+
+def swap_sender(log):
+    """Caller of a Swap (the indexed `sender` topic), usually a router"""
+    return topic_address(log, 1)
+
+
+class WindowAggregate:
+    """Streaming totals, swap sizes and top traders for one pool (or all pools) over one window"""
+
+    def __init__(self):
+        from wban_sketches import KLLSketch, SpaceSaving
+
+        self.swap_count = 0
+        self.volume_wban = 0.0
+        self.swap_sizes = KLLSketch()
+        self.top_volume = SpaceSaving(TOP_K_CAPACITY)
+        self.top_count = SpaceSaving(TOP_K_CAPACITY)
+        self.top_senders = SpaceSaving(TOP_K_CAPACITY)
+        self.hourly_volume = {}   # hour -> wBAN volume, for valuing at historical prices
+
+    def add(self, volume, trader, timestamp=None, sender=None):
+        self.swap_count += 1
+        self.volume_wban += volume
+        self.swap_sizes.add(volume)
+        if timestamp is not None:
+            hour = hour_of(timestamp)
+            self.hourly_volume[hour] = self.hourly_volume.get(hour, 0.0) + volume
+        if trader:
+            self.top_volume.add(trader, volume)
+            self.top_count.add(trader, 1)
+        if sender:
+            self.top_senders.add(sender, volume)
+
+    def merge(self, other):
+        self.swap_count += other.swap_count
+        self.volume_wban += other.volume_wban
+        self.swap_sizes.merge(other.swap_sizes)
+        self.top_volume.merge(other.top_volume)
+        self.top_count.merge(other.top_count)
+        self.top_senders.merge(other.top_senders)
+        for hour, volume in other.hourly_volume.items():
+            self.hourly_volume[hour] = self.hourly_volume.get(hour, 0.0) + volume
+        return self
+
+    def volume_usd(self, price, price_table=None):
+        """USD volume: hourly buckets at that hour's price, anything untimed at the current price"""
+        if not price_table:
+            return self.volume_wban * price if price else None
+        hours = sorted(self.hourly_volume)
+        volumes = [self.hourly_volume[hour] for hour in hours]
+        untimed = max(self.volume_wban - sum(volumes), 0.0)
+        if untimed and not price:
+            return None
+        return price_table.value(hours, volumes) + (untimed * price if untimed else 0.0)
+
+    def summary(self, price, price_table=None):
+        return {
+            "swap_count": self.swap_count,
+            "volume_wban": self.volume_wban,
+            "volume_usd": self.volume_usd(price, price_table),
+            "swap_size": self.swap_size(),
+        }
+
+    def swap_size(self):
+        """Swap-size distribution in wBAN: quantiles plus min/max"""
+        values = self.swap_sizes.quantiles(list(SWAP_SIZE_QUANTILES.values()))
+        distribution = dict(zip(SWAP_SIZE_QUANTILES, values))
+        distribution["min"] = self.swap_sizes.min
+        distribution["max"] = self.swap_sizes.max
+        return distribution
+
+    def top_traders(self, n=TOP_K):
+        return {
+            "by_volume": [{"address": a, "volume_wban": w, "error": e} for a, w, e in self.top_volume.top(n)],
+            "by_count": [{"address": a, "swap_count": int(w), "error": int(e)} for a, w, e in self.top_count.top(n)],
+            "senders_by_volume": [{"address": a, "volume_wban": w, "error": e} for a, w, e in self.top_senders.top(n)],
+        }
+
+    def to_state(self):
+        return {
+            "swap_count": self.swap_count,
+            "volume_wban": self.volume_wban,
+            "swap_sizes": self.swap_sizes.to_state(),
+            "top_volume": self.top_volume.to_state(),
+            "top_count": self.top_count.to_state(),
+            "top_senders": self.top_senders.to_state(),
+            "hourly_volume": [[hour, volume] for hour, volume in sorted(self.hourly_volume.items())],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        from wban_sketches import KLLSketch, SpaceSaving
+
+        aggregate = cls()
+        aggregate.swap_count = state["swap_count"]
+        aggregate.volume_wban = state["volume_wban"]
+        if "swap_sizes" in state:
+            aggregate.swap_sizes = KLLSketch.from_state(state["swap_sizes"])
+        aggregate.top_volume = SpaceSaving.from_state(state["top_volume"])
+        aggregate.top_count = SpaceSaving.from_state(state["top_count"])
+        if "top_senders" in state:
+            aggregate.top_senders = SpaceSaving.from_state(state["top_senders"])
+        aggregate.hourly_volume = {hour: volume for hour, volume in state.get("hourly_volume", [])}
+        return aggregate
+
+
+def aggregate_swaps(logs, wban_is_token0, from_block_1m, from_block_3m=0, to_block=None, clock=None):
+    """Fold Swap logs into a WindowAggregate per window
+
+    clock=(head_block, head_timestamp, block_time) timestamps each swap so
+    its volume can be valued at the price of its hour.
+    """
+    windows = {window: WindowAggregate() for window in WINDOWS}
+    for log in logs:
+        block = log["blockNumber"]
+        if block < from_block_3m or (to_block is not None and block > to_block):
+            continue
+        try:
+            volume = decode_swap_volume(log["data"], wban_is_token0)
+        except Exception:
+            volume = 0
+        trader = swap_trader(log)
+        sender = swap_sender(log)
+        timestamp = swap_timestamp(log, *clock) if clock else None
+
+        windows["3_months"].add(volume, trader, timestamp, sender)
+        if block >= from_block_1m:
+            windows["1_month"].add(volume, trader, timestamp, sender)
+    return windows
+
+
+def pool_window_results(windows, price, price_table=None):
+    """Per-window fields of a pool's entry in the output file
+
+    "sketches" keeps the mergeable state so totals (and later runs) can
+    combine pools without the raw swaps.
+    """
+    results = {window: aggregate.summary(price, price_table) for window, aggregate in windows.items()}
+    results["top_traders"] = {window: aggregate.top_traders() for window, aggregate in windows.items()}
+    results["sketches"] = {window: aggregate.to_state() for window, aggregate in windows.items()}
+    return results
+
+
 class WBANAnalytics:
     def __init__(self):
         existing = load_existing_data()
@@ -188,9 +590,32 @@ class WBANAnalytics:
                 },
             }
         self.wban_price_usd = self.results.get("wban_price_usd")
+        # off | cache | record | replay, see wban_rpc_cache
+        self.rpc_cache_mode = os.getenv("WBAN_RPC_CACHE", "cache")
+        # Send slow getLogs chunks to a second endpoint, see wban_hedge
+        self.hedge = os.getenv("WBAN_HEDGE", "") not in ("", "0")
+        self.hedgers = {}
+        self.pending_history = {}   # network_id -> 1 month scan still to be extended to 3 months
+        # coinex | stored | static:<price or file>, see wban_prices; replayed runs stay offline
+        default_source = "stored" if self.rpc_cache_mode == "replay" else "coinex"
+        self.price_source_name = os.getenv("WBAN_PRICE_SOURCE") or default_source
+        self.price_source = price_source(self.price_source_name)
+        if self.price_source_name.startswith("static:"):
+            self.price_table = PriceTable(path=None)
+        else:
+            self.price_table = PriceTable.load()
+        # Non-stablecoin quote tokens (WETH), for pricing cross-chain matches at the swap's hour
+        self.quote_price_tables = load_quote_price_tables()
 
     async def get_wban_price(self):
-        """Fetch current wBAN price from CoinEx"""
+        """Fetch current wBAN price from CoinEx (other price sources use the latest close in the table)"""
+        import httpx
+
+        if self.price_source_name != "coinex":
+            if self.price_table.latest() is not None:
+                self.wban_price_usd = self.price_table.latest()
+            return self.wban_price_usd
+
         url = "https://api.coinex.com/v1/market/ticker?market=BANANOUSDT"
         try:
             async with httpx.AsyncClient(timeout=10) as client:
@@ -201,33 +626,81 @@ class WBANAnalytics:
                     return self.wban_price_usd
         except Exception as e:
             logger.error(f"Error fetching wBAN price: {e}")
+        if self.price_table.latest() is not None:
+            self.wban_price_usd = self.price_table.latest()
         return self.wban_price_usd  # Return cached if available
 
-    def get_web3_connection(self, rpc_url):
+    async def refresh_price_table(self, source=None):
+        """Top up the hourly price history used to value swaps at their own time"""
+        from wban_prices import CoinExPriceSource
+
+        source = source or self.price_source
+        if source is None:
+            return
+        try:
+            await self.price_table.refresh(source)
+        except Exception as e:
+            logger.error(f"Error refreshing price history: {e}")
+
+        # Quote token prices only come from the market; stand-in sources leave them as stored
+        if isinstance(source, CoinExPriceSource):
+            for token, table in self.quote_price_tables.items():
+                try:
+                    await table.refresh(CoinExPriceSource(table.market))
+                except Exception as e:
+                    logger.error(f"Error refreshing {token} price history: {e}")
+
+    def get_rpc_cache(self, network_id):
+        """Response cache shared by every connection to a network"""
+        from wban_rpc_cache import get_cache
+
+        return get_cache(network_id, self.rpc_cache_mode, NETWORKS[network_id]["finality_blocks"])
+
+    def get_hedger(self, network_id):
+        """Hedging state (latencies, budget) for a network, kept across scans"""
+        from wban_hedge import HEDGE_BUDGET, Hedger
+
+        if network_id not in self.hedgers:
+            config = NETWORKS[network_id]
+            self.hedgers[network_id] = Hedger(
+                network_id, config["rpc_urls"], self.get_rpc_cache(network_id),
+                budget=config.get("hedge_budget", HEDGE_BUDGET),
+            )
+        return self.hedgers[network_id]
+
+    async def aclose(self):
+        """Close the hedgers' HTTP clients; they are opened again if another scan needs them"""
+        for hedger in self.hedgers.values():
+            await hedger.aclose()
+
+    def get_web3_connection(self, rpc_url, network_id):
         """Get Web3 connection for a specific RPC"""
+        from web3 import Web3
+        from wban_rpc_cache import make_provider
+
         try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 20}))
+            provider = make_provider(rpc_url, self.get_rpc_cache(network_id), request_kwargs={'timeout': 20})
+            w3 = Web3(provider)
             if w3.is_connected():
                 return w3
         except:
             pass
         return None
 
-    def get_working_web3(self, chain_id):
+    def get_working_web3(self, network_id):
         """Try all RPCs and return a working one"""
-        config = CHAINS[chain_id]
+        config = NETWORKS[network_id]
         for rpc_url in config["rpc_urls"]:
-            w3 = self.get_web3_connection(rpc_url)
+            w3 = self.get_web3_connection(rpc_url, network_id)
             if w3:
                 return w3, rpc_url
         return None, None
 
-    async def get_liquidity(self, chain_id):
-        """Get current liquidity for a chain"""
-        config = CHAINS[chain_id]
-        w3, _ = self.get_working_web3(chain_id)
-        if not w3:
-            return None, None
+    async def get_liquidity(self, pool_id, w3):
+        """Get current liquidity for a pool"""
+        from web3 import Web3
+
+        config = POOLS[pool_id]
 
         try:
             contract = w3.eth.contract(
@@ -245,60 +718,134 @@ class WBANAnalytics:
 
             return wban_reserve, quote_reserve
         except Exception as e:
-            logger.error(f"Error getting liquidity for {chain_id}: {e}")
+            logger.error(f"Error getting liquidity for {pool_id}: {e}")
             return None, None
 
-    async def fetch_swap_events(self, chain_id, from_block, to_block):
-        """Fetch Swap events with aggressive retry and RPC switching"""
-        config = CHAINS[chain_id]
-        lp_address = Web3.to_checksum_address(config["lp_address"])
+    async def fetch_swap_events(self, network_id, from_block, to_block, strict=False):
+        """Fetch Swap events for every pool on a network with aggressive retry and RPC switching
+
+        One eth_getLogs call covers all of the network's pools (address list);
+        logs are split back out per pool. Returns {pool_id: [logs]}, each log
+        carrying its block's blockTimestamp (from a block header if the RPC left it out).
+        With strict=True a range that keeps failing raises instead of being skipped.
+        """
+        from web3 import Web3
+        import wban_ratelimit as ratelimit
+
+        config = NETWORKS[network_id]
+        pools = network_pools(network_id)
+        pool_by_address = {pool["lp_address"].lower(): pool_id for pool_id, pool in pools.items()}
+        lp_addresses = [Web3.to_checksum_address(pool["lp_address"]) for pool in pools.values()]
 
         # Start with reasonable range based on chain
-        if chain_id == "arbitrum":
-            max_range = 100000
-        elif chain_id in ["polygon"]:
-            max_range = 5000
-        elif chain_id in ["bsc", "bsc_usdc"]:
-            max_range = 5000
-        else:
-            max_range = 5000
+        max_range = config["max_range"]
 
+        events_by_pool = {pool_id: [] for pool_id in pools}
         all_events = []
         current_from = from_block
-        total_blocks = to_block - from_block
+        total_blocks = max(to_block - from_block, 1)
         rpc_index = 0
         fail_count = 0
         range_fail_count = 0
 
-        logger.info(f"Fetching swaps for {chain_id}: {total_blocks:,} blocks")
+        logger.info(f"Fetching swaps for {network_id}: {total_blocks:,} blocks")
 
-        # Get initial connection
-        w3, current_rpc = self.get_working_web3(chain_id)
+        # Get initial connection (blocking web3 calls run in a thread so the
+        # event loop - lease renewal, hedged requests - keeps running meanwhile)
+        w3, current_rpc = await asyncio.to_thread(self.get_working_web3, network_id)
         if not w3:
-            logger.error(f"No working RPC for {chain_id}")
-            return []
-
-        while current_from < to_block:
-            current_to = min(current_from + max_range, to_block)
-
-            try:
-                logs = w3.eth.get_logs({
-                    "fromBlock": current_from,
-                    "toBlock": current_to,
-                    "address": lp_address,
+            logger.error(f"No working RPC for {network_id}")
+            if strict:
+                raise RuntimeError(f"No working RPC for {network_id}")
+            return events_by_pool
+
+        # The cache needs to know the head to tell which ranges are finalized
+        rpc_cache = self.get_rpc_cache(network_id)
+        if rpc_cache.mode == "cache" and rpc_cache.head is None:
+            await asyncio.to_thread(lambda: w3.eth.block_number)
+
+        hedger = self.get_hedger(network_id) if self.hedge else None
+
+        async def request(lo, hi):
+            if hedger:
+                return await hedger.get_logs(current_rpc, {
+                    "fromBlock": hex(lo),
+                    "toBlock": hex(hi),
+                    "address": lp_addresses,
                     "topics": [SWAP_EVENT_TOPIC]
                 })
-                all_events.extend(logs)
+            # Paced by the host's token bucket inside the provider, off the event loop
+            return await asyncio.to_thread(w3.eth.get_logs, {
+                "fromBlock": lo,
+                "toBlock": hi,
+                "address": lp_addresses,
+                "topics": [SWAP_EVENT_TOPIC]
+            })
+
+        def keep(logs):
+            # Aligned requests may reach outside the range we were asked for, and after
+            # max_range changes (or bisection hands over) back into blocks already kept
+            logs = [log for log in logs if current_from <= log["blockNumber"] <= to_block]
+            all_events.extend(logs)
+            for log in logs:
+                pool_id = pool_by_address.get(log["address"].lower())
+                if pool_id:
+                    events_by_pool[pool_id].append(log)
+
+        # Sparse networks: whole range first, bisecting only where refused or capped
+        density = network_swap_density(self.results, network_id)
+        if density is not None and density * total_blocks <= SPARSE_MAX_SWAPS:
+            logger.info(f"{network_id}: sparse (~{density * total_blocks:.0f} swaps expected), bisecting from the full range")
+            ranges = aligned_ranges(from_block, to_block, config["max_range"])[::-1]
+            refused_span = None   # smallest span refused so far; larger ones are split without asking
+            requests = throttles = 0
+            while ranges:
+                lo, hi = ranges.pop()
+                if hi > lo and refused_span is not None and hi - lo + 1 >= refused_span:
+                    first, second = split_range(lo, hi, config["max_range"])
+                    ranges += [second, first]
+                    continue
+                try:
+                    requests += 1
+                    logs = await request(lo, hi)
+                except Exception as e:
+                    throttled = ratelimit.throttle_retry_after(e)[0]
+                    throttles += throttled
+                    if throttled and throttles < BISECT_MAX_THROTTLES:
+                        ranges.append((lo, hi))
+                        continue
+                    if throttled or not is_range_error(e) or hi == lo:
+                        # The chunked scan below picks up from here with its retries and RPC switching
+                        logger.info(f"{network_id}: bisection stopped at block {lo:,} ({e}), continuing in chunks")
+                        break
+                    refused_span = min(refused_span or hi - lo + 1, hi - lo + 1)
+                    logs = None
+                if logs is None or (len(logs) >= LOG_RESULT_CAP and hi > lo):
+                    first, second = split_range(lo, hi, config["max_range"])
+                    ranges += [second, first]
+                    continue
+                keep(logs)
+                # Ranges are popped in ascending order, so everything before hi is done
+                current_from = hi + 1
+            logger.info(f"{network_id}: {requests} requests for {current_from - from_block:,} blocks")
+
+        while current_from <= to_block:
+            # Chunks sit on a fixed grid of max_range blocks so finalized ones hit the RPC cache on later runs
+            request_from = current_from // max_range * max_range
+            current_to = min(request_from + max_range - 1, to_block)
+
+            try:
+                logs = await request(request_from, current_to)
+                keep(logs)
                 fail_count = 0
                 range_fail_count = 0
 
                 # Progress
                 progress = ((current_to - from_block) / total_blocks) * 100
                 if len(all_events) % 100 < len(logs) or progress % 10 < (max_range / total_blocks * 100):
-                    logger.info(f"{chain_id}: {progress:.1f}% - {len(all_events)} swaps")
+                    logger.info(f"{network_id}: {progress:.1f}% - {len(all_events)} swaps")
 
                 current_from = current_to + 1
-                await asyncio.sleep(0.05)
 
             except Exception as e:
                 error_msg = str(e).lower()
@@ -309,7 +856,7 @@ class WBANAnalytics:
                     range_fail_count += 1
                     if range_fail_count >= 3 and max_range > 500:
                         max_range = max(max_range // 2, 500)
-                        logger.info(f"{chain_id}: Reducing range to {max_range}")
+                        logger.info(f"{network_id}: Reducing range to {max_range}")
                         range_fail_count = 0
                         continue
                     elif max_range <= 500:
@@ -321,106 +868,156 @@ class WBANAnalytics:
                     rpc_index += 1
                     if rpc_index < len(config["rpc_urls"]):
                         new_rpc = config["rpc_urls"][rpc_index]
-                        logger.info(f"{chain_id}: Switching to RPC #{rpc_index + 1}: {new_rpc[:40]}...")
-                        w3 = self.get_web3_connection(new_rpc)
+                        logger.info(f"{network_id}: Switching to RPC #{rpc_index + 1}: {new_rpc[:40]}...")
+                        w3 = await asyncio.to_thread(self.get_web3_connection, new_rpc, network_id)
                         if w3:
+                            current_rpc = new_rpc
                             fail_count = 0
                             max_range = max(max_range, 2000)  # Reset range a bit
                             continue
                     else:
                         # Tried all RPCs, cycle back
                         rpc_index = 0
-                        logger.warning(f"{chain_id}: Cycling through RPCs again")
+                        logger.warning(f"{network_id}: Cycling through RPCs again")
 
                         # If we've really struggled, just move on
                         if fail_count >= 10:
-                            logger.error(f"{chain_id}: Too many failures, skipping block range")
+                            if strict:
+                                raise RuntimeError(f"{network_id}: Too many failures at blocks {current_from}-{current_to}")
+                            logger.error(f"{network_id}: Too many failures, skipping block range")
                             current_from = current_to + 1
                             fail_count = 0
 
-                await asyncio.sleep(1)
-
-        logger.info(f"{chain_id}: Done - {len(all_events)} total swaps")
-        return all_events
+                # A throttled host already waits in its token bucket; other errors back off
+                if not ratelimit.throttle_retry_after(e)[0]:
+                    await asyncio.sleep(1)
+
+        if hedger and hedger.hedges:
+            logger.info(f"{network_id}: hedged {hedger.hedges}/{hedger.requests} requests, "
+                        f"{hedger.hedge_wins} won by the backup")
+
+        # Swaps keep their real block time; estimates drift too far for cross-chain matching
+        untimed = {log["blockNumber"] for log in all_events if log.get("blockTimestamp") is None}
+        if untimed and w3:
+            timestamps = await self.block_timestamps(network_id, w3, untimed)
+            for pool_id, logs in events_by_pool.items():
+                events_by_pool[pool_id] = [
+                    dict(log, blockTimestamp=timestamps[log["blockNumber"]])
+                    if log.get("blockTimestamp") is None and log["blockNumber"] in timestamps else log
+                    for log in logs
+                ]
+        logger.info(f"{network_id}: Done - {len(all_events)} total swaps")
+        return events_by_pool
+
+    async def block_timestamps(self, network_id, w3, blocks):
+        """{block: timestamp} from block headers (finalized ones come from the RPC cache)
+
+        Stops at the first failure; swaps in the blocks left out fall back to estimated times.
+        """
+        timestamps = {}
+        for block in sorted(blocks):
+            try:
+                header = await asyncio.to_thread(w3.eth.get_block, block)
+            except Exception as e:
+                logger.warning(f"{network_id}: no timestamp for block {block:,} ({e}), "
+                               f"estimating {len(blocks) - len(timestamps)} block times")
+                break
+            timestamps[block] = header["timestamp"]
+        return timestamps
 
     def parse_swap_event(self, log, wban_is_token0):
         """Parse a Swap event to extract wBAN volume"""
         try:
-            data = log["data"].hex() if isinstance(log["data"], bytes) else log["data"]
-            if data.startswith("0x"):
-                data = data[2:]
-
-            amount0_in = int(data[0:64], 16)
-            amount1_in = int(data[64:128], 16)
-            amount0_out = int(data[128:192], 16)
-            amount1_out = int(data[192:256], 16)
-
-            if wban_is_token0:
-                wban_in = amount0_in / 10**18
-                wban_out = amount0_out / 10**18
-            else:
-                wban_in = amount1_in / 10**18
-                wban_out = amount1_out / 10**18
-
-            return wban_in + wban_out
+            return decode_swap_volume(log["data"], wban_is_token0)
         except Exception as e:
             return 0
 
-    async def analyze_chain(self, chain_id):
-        """Analyze swap activity for a single chain"""
-        config = CHAINS[chain_id]
+    async def analyze_network(self, network_id):
+        """Scan a network's last month and build entries for its pools
+
+        Only the 1 month window is scanned here, so it can be published
+        before the older history; each pool's 3 month entry covers that month
+        too and is marked "complete": False until extend_network() has
+        scanned the rest.
+        """
+        config = NETWORKS[network_id]
         logger.info(f"=== Analyzing {config['name']} ===")
 
-        w3, _ = self.get_working_web3(chain_id)
+        w3, _ = self.get_working_web3(network_id)
         if not w3:
-            logger.error(f"Could not connect to {chain_id}")
+            logger.error(f"Could not connect to {network_id}")
             return None
 
         current_block = w3.eth.block_number
+        head_timestamp = w3.eth.get_block(current_block)["timestamp"]
 
         # Calculate block ranges
-        blocks_per_day = int(86400 / config["block_time"])
-        blocks_1_month = blocks_per_day * 30
-        blocks_3_months = blocks_per_day * 90
+        from_block_1m, from_block_3m = window_start_blocks(config, current_block)
 
-        from_block_1m = max(1, current_block - blocks_1_month)
-        from_block_3m = max(1, current_block - blocks_3_months)
+        # Fetch swap events for all pools at once
+        events_by_pool = await self.fetch_swap_events(network_id, from_block_1m, current_block)
 
-        # Get liquidity
-        wban_reserve, quote_reserve = await self.get_liquidity(chain_id)
+        reserves = {}
+        for pool_id, events in events_by_pool.items():
+            save_swap_logs(pool_id, events)
+            reserves[pool_id] = await self.get_liquidity(pool_id, w3)
 
-        # Fetch swap events
-        events_3m = await self.fetch_swap_events(chain_id, from_block_3m, current_block)
-        events_1m = [e for e in events_3m if e["blockNumber"] >= from_block_1m]
-
-        # Calculate volumes
-        volume_1m = sum(self.parse_swap_event(e, config["wban_is_token0"]) for e in events_1m)
-        volume_3m = sum(self.parse_swap_event(e, config["wban_is_token0"]) for e in events_3m)
-
-        # USD liquidity
-        liquidity_usd = wban_reserve * self.wban_price_usd * 2 if wban_reserve and self.wban_price_usd else None
-
-        return {
-            "name": config["name"],
-            "lp_address": config["lp_address"],
+        scan = {
             "current_block": current_block,
-            "liquidity": {
-                "wban": wban_reserve,
-                "quote_token": config["quote_token"],
-                "quote_amount": quote_reserve,
-                "usd": liquidity_usd,
-            },
-            "1_month": {
-                "swap_count": len(events_1m),
-                "volume_wban": volume_1m,
-                "volume_usd": volume_1m * self.wban_price_usd if self.wban_price_usd else None,
-            },
-            "3_months": {
-                "swap_count": len(events_3m),
-                "volume_wban": volume_3m,
-                "volume_usd": volume_3m * self.wban_price_usd if self.wban_price_usd else None,
-            },
+            "head_timestamp": head_timestamp,
+            "from_block_1m": from_block_1m,
+            "from_block_3m": from_block_3m,
+            "reserves": reserves,
+            "events": events_by_pool,
         }
+        if from_block_3m < from_block_1m:
+            self.pending_history[network_id] = scan
+        return self.network_results(network_id, scan, complete=from_block_3m >= from_block_1m)
+
+    async def extend_network(self, network_id):
+        """Scan the rest of the 3 month window behind a network's published month"""
+        scan = self.pending_history.get(network_id)
+        if scan is None:
+            return None
+        logger.info(f"=== Extending {NETWORKS[network_id]['name']} to 3 months ===")
+
+        older = await self.fetch_swap_events(network_id, scan["from_block_3m"], scan["from_block_1m"] - 1)
+        for pool_id, events in older.items():
+            save_swap_logs(pool_id, events)
+            scan["events"][pool_id] = events + scan["events"][pool_id]
+        del self.pending_history[network_id]
+        return self.network_results(network_id, scan, complete=True)
+
+    def network_results(self, network_id, scan, complete=True):
+        """Output entries for a network's pools from one scan"""
+        results = {}
+        for pool_id, events in scan["events"].items():
+            pool = POOLS[pool_id]
+            wban_reserve, quote_reserve = scan["reserves"][pool_id]
+
+            # Calculate volumes and top traders per window
+            clock = (scan["current_block"], scan["head_timestamp"], NETWORKS[network_id]["block_time"])
+            windows = aggregate_swaps(events, pool["wban_is_token0"], scan["from_block_1m"], clock=clock)
+
+            # USD liquidity
+            liquidity_usd = wban_reserve * self.wban_price_usd * 2 if wban_reserve and self.wban_price_usd else None
+
+            results[pool_id] = {
+                "name": pool["name"],
+                "network": network_id,
+                "lp_address": pool["lp_address"],
+                "current_block": scan["current_block"],
+                "head_timestamp": scan["head_timestamp"],
+                "liquidity": {
+                    "wban": wban_reserve,
+                    "quote_token": pool["quote_token"],
+                    "quote_amount": quote_reserve,
+                    "usd": liquidity_usd,
+                },
+                **pool_window_results(windows, self.wban_price_usd, self.price_table),
+            }
+            results[pool_id]["3_months"]["complete"] = complete
+        return results
 
     def recalculate_totals(self):
         """Recalculate totals from chain data"""
@@ -439,39 +1036,87 @@ class WBANAnalytics:
             if chain_data["3_months"]["volume_usd"]:
                 self.results["totals"]["3_months"]["volume_usd"] += chain_data["3_months"]["volume_usd"]
 
+        # Cross-chain swap sizes and top traders: merge the per-pool sketches
+        merged = {window: WindowAggregate() for window in WINDOWS}
+        for chain_data in self.results["chains"].values():
+            for window, state in chain_data.get("sketches", {}).items():
+                merged[window].merge(WindowAggregate.from_state(state))
+        for window in WINDOWS:
+            self.results["totals"][window]["swap_size"] = merged[window].swap_size()
+        self.results["totals"]["top_traders"] = {window: merged[window].top_traders() for window in WINDOWS}
+        self.results["totals"]["3_months"]["complete"] = all(
+            chain_data["3_months"].get("complete", True) for chain_data in self.results["chains"].values())
+
     async def run_analysis(self, skip_existing=True):
         """Run analysis, optionally skipping chains we already have"""
-        logger.info("Starting wBAN analytics...")
+        from wban_rollups import update_rollups
 
-        # Get price
-        await self.get_wban_price()
-        if self.wban_price_usd:
-            logger.info(f"wBAN price: ${self.wban_price_usd:.6f}")
-
-        # Analyze each chain
-        for chain_id in CHAINS:
-            # Skip if we already have data for this chain
-            if skip_existing and chain_id in self.results.get("chains", {}):
-                logger.info(f"Skipping {chain_id} - already have data")
-                continue
+        logger.info("Starting wBAN analytics...")
 
+        try:
+            # Get price (and the hourly history swaps are valued with)
+            await self.refresh_price_table()
+            await self.get_wban_price()
+            if self.wban_price_usd:
+                logger.info(f"wBAN price: ${self.wban_price_usd:.6f}")
+
+            def publish(result, stage):
+                """Save after each network so the dashboard fills in as we go"""
+                self.results["chains"].update(result)
+                self.results["generated_at"] = datetime.now(timezone.utc).isoformat()
+                self.results["wban_price_usd"] = self.wban_price_usd
+                self.results["scan"] = {"stage": stage, "pending": sorted(self.pending_history)}
+                self.recalculate_totals()
+                save_data(self.results)
+                update_rollups({**self.results, "chains": result})
+
+            # Recent first: the last month of every network (all of its pools in one scan)...
+            for network_id in NETWORKS:
+                # Skip if we already have complete data for every pool on this network
+                # (a run that died before extending to 3 months leaves partial entries behind)
+                if skip_existing and all(has_complete_data(self.results, pool_id) for pool_id in network_pools(network_id)):
+                    logger.info(f"Skipping {network_id} - already have data")
+                    continue
+
+                try:
+                    result = await self.analyze_network(network_id)
+                    if result:
+                        publish(result, "1_month")
+                        logger.info(f"Saved 1 month data for {network_id}")
+
+                except Exception as e:
+                    logger.error(f"Error analyzing {network_id}: {e}")
+
+            # ...then back to 3 months, publishing each network as it completes
+            for network_id in list(self.pending_history):
+                try:
+                    result = await self.extend_network(network_id)
+                    if result:
+                        publish(result, "3_months")
+                        logger.info(f"Saved 3 month data for {network_id}")
+
+                except Exception as e:
+                    logger.error(f"Error extending {network_id}: {e}")
+
+            if self.results.get("scan"):
+                # Networks whose extension failed stay partial; the next fetch rescans them
+                stage = "incomplete" if self.pending_history else "complete"
+                self.results["scan"] = {"stage": stage, "pending": sorted(self.pending_history)}
+                save_data(self.results)
+
+            # Cross-chain swap matching over the freshly stored logs
             try:
-                result = await self.analyze_chain(chain_id)
-                if result:
-                    self.results["chains"][chain_id] = result
-
-                    # Save after each chain!
-                    self.results["generated_at"] = datetime.now(timezone.utc).isoformat()
-                    self.results["wban_price_usd"] = self.wban_price_usd
-                    self.recalculate_totals()
-                    save_data(self.results)
-                    logger.info(f"Saved data after completing {chain_id}")
+                from wban_arbitrage import find_arbitrage
 
+                self.results["arbitrage"] = find_arbitrage(self.results, quote_prices=self.quote_price_tables)
+                save_data(self.results)
             except Exception as e:
-                logger.error(f"Error analyzing {chain_id}: {e}")
+                logger.error(f"Error matching cross-chain swaps: {e}")
 
-        self.print_summary()
-        return self.results
+            self.print_summary()
+            return self.results
+        finally:
+            await self.aclose()
 
     def print_summary(self):
         """Print summary"""
@@ -496,7 +1141,8 @@ class WBANAnalytics:
 
         print(f"\n  TOTAL: {self.results['totals']['1_month']['swap_count']} swaps")
 
-        print("\n--- 3 MONTHS ---")
+        partial = self.results.get("totals", {}).get("3_months", {}).get("complete") is False
+        print("\n--- 3 MONTHS (partial, still scanning) ---" if partial else "\n--- 3 MONTHS ---")
         for chain_id, data in sorted(self.results["chains"].items(),
                                       key=lambda x: x[1]["3_months"]["swap_count"], reverse=True):
             print(f"  {data['name']}: {data['3_months']['swap_count']} swaps, "
@@ -507,6 +1153,7 @@ class WBANAnalytics:
 
 
 async def main():
+    setup_logging()
     analytics = WBANAnalytics()
     await analytics.run_analysis(skip_existing=True)
 
@@ -2,13 +2,10 @@
 Quick BSC/Arbitrum fetch with smaller time ranges
 """
 import asyncio
-import httpx
 import json
 from datetime import datetime, timezone
-from web3 import Web3
 import logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("wBAN_quick")
 
 SWAP_EVENT_TOPIC = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"
@@ -80,6 +77,8 @@ def save_data(data):
 
 
 async def get_wban_price():
+    import httpx
+
     try:
         async with httpx.AsyncClient(timeout=10) as client:
             r = await client.get("https://api.coinex.com/v1/market/ticker?market=BANANOUSDT")
@@ -87,10 +86,15 @@ async def get_wban_price():
                 return float(r.json()["data"]["ticker"]["last"])
     except:
         pass
-    return 0.000481  # fallback
+    # Fall back to the last hourly close wban_analytics has stored, if any
+    from wban_prices import PriceTable
+
+    return PriceTable.load().latest()
 
 
 def get_web3(chain_id):
+    from web3 import Web3
+
     for url in CHAINS[chain_id]["rpc_urls"]:
         try:
             w3 = Web3(Web3.HTTPProvider(url, request_kwargs={'timeout': 30}))
@@ -104,6 +108,8 @@ def get_web3(chain_id):
 
 async def fetch_swaps(chain_id, w3, from_block, to_block, max_range=2000):
     """Fetch with smaller range for BSC"""
+    from web3 import Web3
+
     config = CHAINS[chain_id]
     lp_address = Web3.to_checksum_address(config["lp_address"])
     all_events = []
@@ -158,6 +164,8 @@ def parse_swap(log, wban_is_token0):
 
 
 async def analyze_chain(chain_id, price):
+    from web3 import Web3
+
     config = CHAINS[chain_id]
     w3 = get_web3(chain_id)
     if not w3:
@@ -202,17 +210,17 @@ async def analyze_chain(chain_id, price):
             "wban": wban,
             "quote_token": config["quote_token"],
             "quote_amount": quote,
-            "usd": wban * price * 2 if wban else None,
+            "usd": wban * price * 2 if wban and price else None,
         },
         "1_month": {
             "swap_count": len(events_1m),
             "volume_wban": vol_1m,
-            "volume_usd": vol_1m * price,
+            "volume_usd": vol_1m * price if price else None,
         },
         "3_months": {
             "swap_count": len(events_3m),
             "volume_wban": vol_3m,
-            "volume_usd": vol_3m * price,
+            "volume_usd": vol_3m * price if price else None,
         },
     }
 
@@ -232,6 +240,7 @@ def recalc_totals(data):
 
 
 async def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     data = load_data()
     price = await get_wban_price()
     logger.info(f"wBAN price: ${price}")
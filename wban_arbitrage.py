@@ -0,0 +1,155 @@
+"""
+Cross-chain swap matching for arbitrage and bridge-flow detection
+Run with: python wbanalytics.py arbitrage [--tolerance SECONDS] [--window 1_month|3_months]
+
+Each pool's stored swaps are already in block order, so they form a
+timestamp-sorted stream. The streams are merged with heapq.merge and swept
+once: every swap is paired with opposite-direction swaps on other networks
+seen within the last `tolerance` seconds, kept in one deque per network and
+direction. Cost is linear in swaps plus matches, not all-pairs.
+
+A pair is one wBAN buy (wBAN leaves a pool) and one sell (wBAN enters a
+pool); its gap is how much higher the sell price was than the buy price.
+Prices are in USD: stablecoin quotes count as $1, and any other quote token
+is valued at its hourly close for the swap's hour (wban_prices quote
+tables). Swaps are timed by their real block timestamps, which
+fetch_swap_events stores with every log; estimates extrapolated from the
+head drift by minutes to hours over a month, far more than the tolerance,
+so logs stored without one are left out.
+"""
+import heapq
+import logging
+from collections import defaultdict, deque
+
+from wban_analytics import CHAINS, decode_swap_amounts, load_swap_logs, window_start_blocks
+
+logger = logging.getLogger("wBAN_arbitrage")
+
+TOLERANCE_SECONDS = 120     # an arbitrage or bridge round trip takes a block or a few on each side
+MIN_SWAP_WBAN = 1.0         # dust swaps have meaningless prices
+TOP_PAIRS = 20
+STABLECOINS = {"BUSD", "USDC", "USDT", "DAI"}
+
+
+def swap_stream(pool_id, since_block=0, quote_prices=None):
+    """(timestamp, pool_id, side, price_usd, volume_wban, tx_hash) for a pool's stored swaps, in time order
+
+    quote_prices is {quote token: PriceTable} for quote tokens that are not stablecoins.
+    """
+    config = CHAINS[pool_id]
+    quote_table = None
+    if config["quote_token"] not in STABLECOINS:
+        quote_table = (quote_prices or {}).get(config["quote_token"])
+        if not quote_table:
+            logger.warning(f"No {config['quote_token']} price history for {pool_id}, skipping")
+            return
+
+    untimed = 0
+    for log in load_swap_logs(pool_id):
+        if log["blockNumber"] < since_block:
+            continue
+        timestamp = log.get("blockTimestamp")
+        if timestamp is None:
+            untimed += 1
+            continue
+        try:
+            wban_in, wban_out, quote_in, quote_out = decode_swap_amounts(
+                log["data"], config["wban_is_token0"], config["quote_decimals"])
+        except Exception:
+            continue
+        # A trader buying wBAN takes it out of the pool and pays in quote, and vice versa
+        side, wban, quote = ("buy", wban_out, quote_in) if wban_out > wban_in else ("sell", wban_in, quote_out)
+        if wban < MIN_SWAP_WBAN or not quote:
+            continue
+        quote_usd = quote_table.price_at(timestamp) if quote_table else 1.0
+        yield timestamp, pool_id, side, quote * quote_usd / wban, wban, log["transactionHash"]
+    if untimed:
+        logger.warning(f"{pool_id}: {untimed} stored swaps have no block timestamp and were not matched, "
+                       f"'fetch --refresh' stores them")
+
+
+def match_swaps(streams, tolerance=TOLERANCE_SECONDS):
+    """Yield (earlier, later) opposite-direction swaps on different networks at most tolerance seconds apart"""
+    recent = defaultdict(deque)   # (network, side) -> swaps within tolerance of the sweep
+    for swap in heapq.merge(*streams, key=lambda s: s[0]):
+        timestamp, pool_id, side = swap[:3]
+        network = CHAINS[pool_id]["network"]
+        opposite = "sell" if side == "buy" else "buy"
+        for (other_network, other_side), window in recent.items():
+            if other_side != opposite or other_network == network:
+                continue
+            while window and window[0][0] < timestamp - tolerance:
+                window.popleft()
+            for earlier in window:
+                yield earlier, swap
+        window = recent[(network, side)]
+        while window and window[0][0] < timestamp - tolerance:
+            window.popleft()
+        window.append(swap)
+
+
+def _pair_record(earlier, later):
+    buy, sell = (earlier, later) if earlier[2] == "buy" else (later, earlier)
+    return {
+        "buy_pool": buy[1], "sell_pool": sell[1],
+        "buy_price_usd": buy[3], "sell_price_usd": sell[3],
+        "gap_pct": (sell[3] - buy[3]) / buy[3] * 100,
+        "lag_seconds": later[0] - earlier[0],
+        "first": earlier[1],
+        "volume_wban": min(buy[4], sell[4]),
+        "buy_tx": buy[5], "sell_tx": sell[5], "timestamp": later[0],
+    }
+
+
+def find_arbitrage(results, window="3_months", tolerance=TOLERANCE_SECONDS, top=TOP_PAIRS,
+                   quote_prices=None):
+    """Match swaps across networks and summarise gaps per buy -> sell route
+
+    quote_prices defaults to the stored quote token price tables.
+    """
+    if quote_prices is None:
+        from wban_prices import load_quote_price_tables
+
+        quote_prices = load_quote_price_tables()
+    streams = []
+    for pool_id, chain_data in results.get("chains", {}).items():
+        if pool_id not in CHAINS:
+            continue
+        from_1m, from_3m = window_start_blocks(CHAINS[pool_id], chain_data["current_block"])
+        since = from_1m if window == "1_month" else from_3m
+        streams.append(swap_stream(pool_id, since, quote_prices))
+
+    routes = defaultdict(lambda: {"pairs": 0, "gap_sum": 0.0, "lag_sum": 0, "volume_wban": 0.0, "leader": defaultdict(int)})
+    largest = []   # min-heap of (gap_pct, n, record) holding the `top` largest gaps
+    matched = 0
+    for earlier, later in match_swaps(streams, tolerance):
+        record = _pair_record(earlier, later)
+        route = routes[f"{record['buy_pool']}->{record['sell_pool']}"]
+        route["pairs"] += 1
+        route["gap_sum"] += record["gap_pct"]
+        route["lag_sum"] += record["lag_seconds"]
+        route["volume_wban"] += record["volume_wban"]
+        route["leader"][record["first"]] += 1
+        matched += 1
+        entry = (record["gap_pct"], matched, record)
+        if len(largest) < top:
+            heapq.heappush(largest, entry)
+        elif entry > largest[0]:
+            heapq.heapreplace(largest, entry)
+
+    return {
+        "window": window,
+        "tolerance_seconds": tolerance,
+        "matched_pairs": matched,
+        "routes": {
+            name: {
+                "pairs": route["pairs"],
+                "mean_gap_pct": route["gap_sum"] / route["pairs"],
+                "mean_lag_seconds": route["lag_sum"] / route["pairs"],
+                "volume_wban": route["volume_wban"],
+                "leader": max(route["leader"], key=route["leader"].get),
+            }
+            for name, route in sorted(routes.items(), key=lambda item: -item[1]["pairs"])
+        },
+        "top_pairs": [record for _, _, record in sorted(largest, reverse=True)],
+    }
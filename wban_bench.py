@@ -0,0 +1,266 @@
+"""
+Microbenchmarks for the non-network hot paths
+Run with: python wbanalytics.py bench [--sizes 1k,10k,100k] [--save-baseline]
+
+Stages, each timed and (in a second, traced run) measured for peak Python
+memory with tracemalloc:
+  decode     parse_swap_event over every swap
+  aggregate  window filter, sums, sketches and hourly buckets (aggregate_swaps)
+             per pool, valued per hour against a synthetic price table
+  totals     recalculate_totals over the pools' results
+  persist    save_data + load_existing_data of the output file
+  swap_logs  save_swap_logs + a full load_swap_logs pass
+  render     load_analytics + the dashboard template (skipped without flask)
+
+Datasets are synthetic: N swaps spread over max(5, N // 100k) pools, so
+large sizes also exercise many-pool outputs. Everything runs in a scratch
+directory, never against the real data files. Results are compared with a
+baseline JSON file; a stage slower or bigger than baseline * (1 + tolerance)
+is reported as a regression and the command exits non-zero.
+wban_bench_baseline.json ships with numbers from a reference machine; run
+with --save-baseline once to compare against your own.
+"""
+import gc
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+logger = logging.getLogger("wBAN_bench")
+
+BASELINE_FILE = "wban_bench_baseline.json"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+STAGES = ("decode", "aggregate", "totals", "persist", "swap_logs", "render")
+TOLERANCE = 0.25
+SWAPS_PER_POOL = 100_000
+DISTINCT_PAYLOADS = 1024
+SMALL_SIZE = 10_000        # sizes up to this are timed best-of-REPEATS to damp noise
+REPEATS = 5
+HEAD_TIMESTAMP = 1_700_000_000
+BLOCK_TIME = 12
+
+
+def parse_size(text):
+    """'10k' / '1M' / '2500' -> int"""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def format_size(n):
+    for unit, scale in (("M", 1_000_000), ("k", 1_000)):
+        if n >= scale and n % scale == 0:
+            return f"{n // scale}{unit}"
+    return str(n)
+
+
+def _payloads(seed=7):
+    """A fixed set of Swap data fields and recipient topics to cycle through"""
+    from wban_analytics import SWAP_EVENT_TOPIC
+
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(DISTINCT_PAYLOADS):
+        wban = int(rng.lognormvariate(7, 2) * 10**18)
+        quote = rng.randint(1, 10**20)
+        buy = rng.random() < 0.5
+        amounts = (0, quote, wban, 0) if buy else (wban, 0, 0, quote)
+        data = "0x" + "".join(f"{a:064x}" for a in amounts)
+        trader = "0x" + "0" * 24 + f"{rng.randrange(5000):040x}"
+        payloads.append((data, [SWAP_EVENT_TOPIC, "0x" + "0" * 64, trader]))
+    return payloads
+
+
+def synthetic_logs(n, payloads):
+    """n compact Swap logs in block order (generated lazily, so memory stays flat)"""
+    for i in range(n):
+        data, topics = payloads[i % len(payloads)]
+        yield {
+            "blockNumber": i,
+            "logIndex": 0,
+            "transactionHash": f"0x{i:064x}",
+            "topics": topics,
+            "data": data,
+        }
+
+
+def price_table():
+    """In-memory hourly closes for the KLINE_LIMIT hours up to HEAD_TIMESTAMP"""
+    from wban_prices import INTERVAL, KLINE_LIMIT, PriceTable, hour_of
+
+    rng = random.Random(11)
+    last = hour_of(HEAD_TIMESTAMP)
+    hours = [last - i * INTERVAL for i in reversed(range(KLINE_LIMIT))]
+    return PriceTable(hours, [0.005 * rng.uniform(0.8, 1.2) for _ in hours], path=None)
+
+
+def pool_sizes(n):
+    """Split n swaps over the synthetic pools"""
+    pools = max(5, n // SWAPS_PER_POOL)
+    return {f"pool_{i:03d}": n // pools + (1 if i < n % pools else 0) for i in range(pools)}
+
+
+def _measure(fn, trace_memory, repeats=1):
+    """(best seconds over repeats, peak bytes or None) for calls of fn"""
+    seconds = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        seconds = min(seconds, time.perf_counter() - started)
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def run_size(n, stages, trace_memory=True):
+    """{stage: {"seconds", "peak_bytes"}} for one dataset size; runs in the current directory"""
+    from wban_analytics import (
+        WBANAnalytics, aggregate_swaps, load_existing_data, load_swap_logs, pool_window_results,
+        save_data, save_swap_logs,
+    )
+
+    payloads = _payloads()
+    pools = pool_sizes(n)
+    price = 0.005
+    prices = price_table()
+    analytics = WBANAnalytics()
+    results = {}
+
+    def decode():
+        for log in synthetic_logs(n, payloads):
+            analytics.parse_swap_event(log, True)
+
+    def aggregate():
+        chains = {}
+        for pool_id, count in pools.items():
+            clock = (count, HEAD_TIMESTAMP, BLOCK_TIME)
+            windows = aggregate_swaps(synthetic_logs(count, payloads), True, from_block_1m=count * 2 // 3, clock=clock)
+            chains[pool_id] = {
+                "name": pool_id, "network": "bench", "lp_address": "0x" + "0" * 40,
+                "current_block": count, "head_timestamp": HEAD_TIMESTAMP,
+                "liquidity": {"wban": 1e6, "quote_token": "USDC", "quote_amount": 5000.0, "usd": 1e4},
+                **pool_window_results(windows, price, prices),
+            }
+        analytics.results["chains"] = chains
+        analytics.results["wban_price_usd"] = price
+
+    def totals():
+        analytics.recalculate_totals()
+
+    def persist():
+        save_data(analytics.results)
+        load_existing_data()
+
+    def swap_logs():
+        if os.path.exists("wban_swap_logs"):
+            shutil.rmtree("wban_swap_logs")
+        save_swap_logs("bench", synthetic_logs(n, payloads))
+        for _ in load_swap_logs("bench"):
+            pass
+
+    def render():
+        import analytics_app
+
+        with analytics_app.app.test_request_context("/"):
+            analytics_app.index()
+
+    steps = {"decode": decode, "aggregate": aggregate, "totals": totals,
+             "persist": persist, "swap_logs": swap_logs, "render": render}
+    # Later stages read what earlier ones produce, so dependencies always run
+    needed = set(stages)
+    if needed & {"totals", "persist", "render"}:
+        needed.add("aggregate")
+    if "render" in needed:
+        needed |= {"totals", "persist"}
+
+    for stage in STAGES:
+        if stage not in needed:
+            continue
+        if stage == "render":
+            try:
+                import flask  # noqa: F401
+            except ImportError:
+                logger.warning("flask not installed, skipping render")
+                continue
+        seconds, peak = _measure(steps[stage], trace_memory, REPEATS if n <= SMALL_SIZE else 1)
+        if stage in stages:
+            results[stage] = {"seconds": seconds, "peak_bytes": peak}
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, stages=STAGES, trace_memory=True):
+    """{size label: {stage: measurement}} for every size, in a scratch directory"""
+    cwd = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix="wban_bench_")
+    report = {}
+    try:
+        os.chdir(scratch)
+        for n in sizes:
+            label = format_size(n)
+            logger.info(f"Benchmarking {label} swaps over {len(pool_sizes(n))} pools")
+            report[label] = run_size(n, stages, trace_memory)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+    return report
+
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(report, path=BASELINE_FILE):
+    """Merge report into the baseline file, keeping sizes and stages it does not cover"""
+    baseline = load_baseline(path)
+    for label, stages in report.items():
+        baseline.setdefault(label, {}).update(stages)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """[(size, stage, metric, baseline, current)] for every measurement over baseline * (1 + tolerance)"""
+    regressions = []
+    for label, stages in report.items():
+        for stage, current in stages.items():
+            previous = baseline.get(label, {}).get(stage)
+            if not previous:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if current.get(metric) is None or not previous.get(metric):
+                    continue
+                if current[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append((label, stage, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def print_report(report, baseline):
+    print(f"{'size':>6} {'stage':<10} {'time':>10} {'vs base':>8} {'peak mem':>10} {'vs base':>8}")
+    for label, stages in report.items():
+        for stage, current in stages.items():
+            previous = baseline.get(label, {}).get(stage, {})
+
+            def ratio(metric):
+                if current.get(metric) is None or not previous.get(metric):
+                    return "-"
+                return f"{current[metric] / previous[metric]:.2f}x"
+
+            peak = f"{current['peak_bytes'] / 2**20:.1f} MiB" if current["peak_bytes"] is not None else "-"
+            print(f"{label:>6} {stage:<10} {current['seconds'] * 1000:>8.1f}ms {ratio('seconds'):>8} "
+                  f"{peak:>10} {ratio('peak_bytes'):>8}")
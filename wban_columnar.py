@@ -0,0 +1,230 @@
+"""
+Columnar export of swap history for notebooks and analysts
+Run with: python wbanalytics.py export --format arrow|parquet [--output DIR]
+
+Writes per-swap rows and daily rollups from the stored swap logs:
+  DIR/swaps/chain=<pool>/month=<YYYY-MM>/part-0.<ext>
+  DIR/rollups/chain=<pool>/daily.<ext>
+  DIR/_manifest.json
+
+Arrow IPC files (the default) are read back memory-mapped and zero-copy
+with read_swaps(); Parquet is smaller and readable by anything. Export is
+incremental: the manifest records how far each pool was exported, and only
+the last exported month and newer ones are rewritten. Timestamps are
+re-estimated from each run's head, so month assignment is pinned: swaps keep
+the month they were exported under, and newer swaps never fall into an
+earlier month, which would otherwise be overwritten from a partial re-read.
+
+Requires pyarrow.
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from wban_analytics import (
+    CHAINS, chain_head_timestamp, decode_swap_amounts, load_swap_logs, swap_timestamp, topic_address,
+)
+
+logger = logging.getLogger("wBAN_columnar")
+
+EXPORT_DIR = "wban_export"
+MANIFEST = "_manifest.json"
+EXTENSIONS = {"arrow": "arrow", "parquet": "parquet"}
+
+SWAP_COLUMNS = [
+    "block_number", "log_index", "timestamp", "tx_hash", "sender", "recipient",
+    "wban_in", "wban_out", "quote_in", "quote_out", "volume_wban",
+]
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("block_number", pa.int64()),
+        ("log_index", pa.int32()),
+        ("timestamp", pa.timestamp("s", tz="UTC")),
+        ("tx_hash", pa.string()),
+        ("sender", pa.string()),
+        ("recipient", pa.string()),
+        ("wban_in", pa.float64()),
+        ("wban_out", pa.float64()),
+        ("quote_in", pa.float64()),
+        ("quote_out", pa.float64()),
+        ("volume_wban", pa.float64()),
+    ])
+
+
+def month_of(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+
+
+def swap_rows(pool_id, head_block, head_timestamp, since_block=0, pinned_month=None, pinned_through=-1):
+    """Decoded swaps of a pool from its stored logs, as column lists grouped by month
+
+    Blocks up to pinned_through go to pinned_month, and nothing after them
+    goes to an earlier month.
+    """
+    config = CHAINS[pool_id]
+    months = defaultdict(lambda: {column: [] for column in SWAP_COLUMNS})
+    for log in load_swap_logs(pool_id):
+        if log["blockNumber"] < since_block:
+            continue
+        try:
+            wban_in, wban_out, quote_in, quote_out = decode_swap_amounts(
+                log["data"], config["wban_is_token0"], config["quote_decimals"])
+        except Exception:
+            continue
+        timestamp = swap_timestamp(log, head_block, head_timestamp, config["block_time"])
+        month = month_of(timestamp)
+        if log["blockNumber"] <= pinned_through or (pinned_month and month < pinned_month):
+            month = pinned_month
+
+        columns = months[month]
+        columns["block_number"].append(log["blockNumber"])
+        columns["log_index"].append(log["logIndex"])
+        columns["timestamp"].append(timestamp)
+        columns["tx_hash"].append(log["transactionHash"])
+        columns["sender"].append(topic_address(log, 1))
+        columns["recipient"].append(topic_address(log, 2))
+        columns["wban_in"].append(wban_in)
+        columns["wban_out"].append(wban_out)
+        columns["quote_in"].append(quote_in)
+        columns["quote_out"].append(quote_out)
+        columns["volume_wban"].append(wban_in + wban_out)
+    return months
+
+
+def _write_table(table, path, fmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        pq.write_table(table, tmp)
+    else:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path):
+    """Memory-mapped read; Arrow IPC columns point straight into the mapping"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if path.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True)
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def daily_rollup(table):
+    """Per-day swap count and wBAN volume of a swaps table"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    days = pc.floor_temporal(table["timestamp"], unit="day")
+    grouped = pa.table({"day": days, "volume_wban": table["volume_wban"]}).group_by("day").aggregate(
+        [("volume_wban", "count"), ("volume_wban", "sum")])
+    return pa.table({
+        "day": grouped["day"],
+        "swap_count": grouped["volume_wban_count"],
+        "volume_wban": grouped["volume_wban_sum"],
+    }).sort_by("day")
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"pools": {}}
+
+
+def export_columnar(results, out_dir=EXPORT_DIR, fmt="arrow", full=False):
+    """Write new or changed month partitions and refresh rollups; returns partitions written
+
+    full=True ignores the manifest, e.g. after backfilling older history.
+    """
+    import pyarrow as pa
+
+    ext = EXTENSIONS[fmt]
+    manifest = load_manifest(out_dir)
+    if full or manifest.get("format", fmt) != fmt:
+        manifest = {"pools": {}}
+    schema = _schema()
+    written = 0
+
+    for pool_id, chain_data in results.get("chains", {}).items():
+        if pool_id not in CHAINS:
+            continue
+        pool_manifest = manifest["pools"].setdefault(pool_id, {"months": {}})
+        head_block = chain_data["current_block"]
+        head_timestamp = chain_head_timestamp(results, chain_data)
+
+        # Re-read from the first block of the last exported month, so that month is completed
+        months_done = sorted(pool_manifest["months"])
+        last_month = pool_manifest["months"][months_done[-1]] if months_done else None
+        since_block = last_month["first_block"] if last_month else 0
+        pinned = (months_done[-1], last_month["last_block"]) if last_month else (None, -1)
+        pool_written = 0
+
+        for month, columns in sorted(swap_rows(pool_id, head_block, head_timestamp, since_block, *pinned).items()):
+            previous = pool_manifest["months"].get(month)
+            if previous and previous["rows"] == len(columns["block_number"]) \
+                    and previous["last_block"] == columns["block_number"][-1]:
+                continue
+            table = pa.table(columns, schema=schema)
+            path = os.path.join(out_dir, "swaps", f"chain={pool_id}", f"month={month}", f"part-0.{ext}")
+            _write_table(table, path, fmt)
+            pool_manifest["months"][month] = {
+                "rows": table.num_rows,
+                "first_block": columns["block_number"][0],
+                "last_block": columns["block_number"][-1],
+            }
+            pool_written += 1
+
+        if pool_written:
+            written += pool_written
+            swaps = read_swaps(out_dir, pool_id, fmt)
+            if swaps.num_rows:
+                _write_table(daily_rollup(swaps), os.path.join(out_dir, "rollups", f"chain={pool_id}", f"daily.{ext}"), fmt)
+
+    manifest["format"] = fmt
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote {written} partitions to {out_dir}")
+    return written
+
+
+def read_swaps(out_dir=EXPORT_DIR, chain=None, fmt="arrow"):
+    """Exported swaps as a memory-mapped pyarrow Table
+
+    Reading every chain adds a `chain` column; reading one chain does not.
+    """
+    import pyarrow as pa
+
+    ext = EXTENSIONS[fmt]
+    root = os.path.join(out_dir, "swaps")
+    tables = []
+    chains = [f"chain={chain}"] if chain else sorted(os.listdir(root)) if os.path.isdir(root) else []
+    for chain_dir in chains:
+        chain_path = os.path.join(root, chain_dir)
+        if not os.path.isdir(chain_path):
+            continue
+        chain_id = chain_dir.split("=", 1)[1]
+        for month_dir in sorted(os.listdir(chain_path)):
+            path = os.path.join(chain_path, month_dir, f"part-0.{ext}")
+            if os.path.exists(path):
+                table = _read_table(path)
+                if chain is None:
+                    table = table.append_column("chain", pa.repeat(pa.scalar(chain_id), table.num_rows))
+                tables.append(table)
+    if not tables:
+        return _schema().empty_table()
+    return pa.concat_tables(tables)
@@ -0,0 +1,141 @@
+"""
+Hedged eth_getLogs requests
+
+If the endpoint we are using has not answered a chunk within the p90 of
+recent chunk latencies, the same request is sent to the next endpoint and
+the first good answer wins; the other request is cancelled. Hedges are
+limited to a fraction of requests per network (its hedge budget) so a
+slow network cannot double our load.
+
+Requests are plain JSON-RPC over httpx so the losing request can actually
+be cancelled; responses still go through the network's RPC cache.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+import wban_ratelimit as ratelimit
+
+logger = logging.getLogger("wBAN_hedge")
+
+HEDGE_PERCENTILE = 0.9
+HEDGE_BUDGET = 0.1           # at most 10% of requests get a second copy
+MIN_HEDGE_DELAY = 0.25       # seconds
+INITIAL_HEDGE_DELAY = 2.0    # until we have enough latency samples
+MIN_SAMPLES = 20
+
+
+class RPCError(Exception):
+    pass
+
+
+def normalize_log(log):
+    """Raw JSON-RPC log -> the shape web3 returns (int block/index), with an int blockTimestamp too"""
+    log = dict(log)
+    for field in ("blockNumber", "logIndex", "transactionIndex", "blockTimestamp"):
+        if isinstance(log.get(field), str):
+            log[field] = int(log[field], 16)
+    return log
+
+
+class Hedger:
+    def __init__(self, network_id, rpc_urls, rpc_cache=None, budget=HEDGE_BUDGET, percentile=HEDGE_PERCENTILE):
+        self.network_id = network_id
+        self.rpc_urls = rpc_urls
+        self.rpc_cache = rpc_cache
+        self.budget = budget
+        self.percentile = percentile
+        self.latencies = deque(maxlen=200)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.client = None
+
+    def get_client(self):
+        if self.client is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(timeout=20)
+        return self.client
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def hedge_delay(self):
+        """How long to wait for the primary before hedging"""
+        if len(self.latencies) < MIN_SAMPLES:
+            return INITIAL_HEDGE_DELAY
+        ordered = sorted(self.latencies)
+        return max(ordered[int(self.percentile * (len(ordered) - 1))], MIN_HEDGE_DELAY)
+
+    def can_hedge(self):
+        return self.hedges < self.budget * self.requests
+
+    def backup_for(self, rpc_url):
+        """The endpoint after rpc_url in the network's list"""
+        index = self.rpc_urls.index(rpc_url) if rpc_url in self.rpc_urls else -1
+        return self.rpc_urls[(index + 1) % len(self.rpc_urls)]
+
+    async def _post(self, client, rpc_url, params):
+        await ratelimit.acquire(rpc_url)
+        started = time.monotonic()
+        try:
+            response = await client.post(rpc_url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_getLogs", "params": params})
+            response.raise_for_status()
+            body = response.json()
+            if "error" in body:
+                raise RPCError(f"{body['error'].get('code')}: {body['error'].get('message')}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            ratelimit.record_result(rpc_url, e)
+            raise
+        ratelimit.record_result(rpc_url)
+        return body["result"], time.monotonic() - started
+
+    async def get_logs(self, rpc_url, filter_params):
+        """eth_getLogs against rpc_url, hedged to the next endpoint if it is slow"""
+        client = self.get_client()
+        params = [filter_params]
+        if self.rpc_cache is not None:
+            cached = self.rpc_cache.get("eth_getLogs", params)
+            if cached is not None:
+                return [normalize_log(log) for log in cached]
+
+        self.requests += 1
+        primary_started = time.monotonic()
+        primary = asyncio.ensure_future(self._post(client, rpc_url, params))
+        pending = {primary}
+        error = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay())
+            backup_url = self.backup_for(rpc_url)
+            if not done and self.can_hedge() and backup_url != rpc_url:
+                self.hedges += 1
+                pending.add(asyncio.ensure_future(self._post(client, backup_url, params)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result, latency = task.result()
+                    if task is not primary:
+                        self.hedge_wins += 1
+                        if not primary.done():
+                            # The slow primary is the sample the hedge delay is about; leaving it
+                            # out would pull the p90 down towards the backup's latency
+                            self.latencies.append(time.monotonic() - primary_started)
+                    self.latencies.append(latency)
+                    if self.rpc_cache is not None:
+                        self.rpc_cache.put("eth_getLogs", params, result)
+                    return [normalize_log(log) for log in result]
+        finally:
+            # Cancel the loser (or everything, if we were cancelled ourselves)
+            for task in pending:
+                task.cancel()
+        raise error
@@ -0,0 +1,238 @@
+"""
+Coordinate block-range scans across workers with a shared lease table
+Run with:
+  python wbanalytics.py queue plan --network arbitrum --from-block N [--to-block M] [--chunk C]
+  python wbanalytics.py queue work        (start as many as you like, on any machine)
+  python wbanalytics.py queue status
+  python wbanalytics.py queue collect     (merge finished ranges into wban_swap_logs/)
+
+Jobs are block ranges in a SQLite file every worker can reach. A worker
+claims a job for `ttl` seconds, renews the lease from a separate thread
+while it fetches, and stores the job's logs and marks it done in one
+transaction - but only if it still holds the lease. Leases that expire (crashed worker) are handed to the
+next claimer, so a range is never lost and never committed twice.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from wban_analytics import WBANAnalytics, compact_log, save_swap_logs
+
+logger = logging.getLogger("wBAN_leases")
+
+LEASE_DB = "wban_leases.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    network TEXT NOT NULL,
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (network, from_block, to_block)
+);
+CREATE TABLE IF NOT EXISTS job_logs (
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    pool_id TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (job_id, pool_id, block_number, log_index)
+);
+"""
+
+
+class LeaseTable:
+    def __init__(self, path=LEASE_DB):
+        # isolation_level=None: transactions are opened explicitly with
+        # BEGIN IMMEDIATE so claim/complete take the write lock up front.
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def plan(self, network_id, from_block, to_block, chunk):
+        """Queue [from_block, to_block] as inclusive ranges of `chunk` blocks"""
+        ranges = [(network_id, start, min(start + chunk - 1, to_block))
+                  for start in range(from_block, to_block + 1, chunk)]
+        self.conn.execute("BEGIN IMMEDIATE")
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO jobs (network, from_block, to_block) VALUES (?, ?, ?)", ranges)
+        added = self.conn.total_changes - before
+        self.conn.execute("COMMIT")
+        return added
+
+    def claim(self, owner, ttl):
+        """Lease the oldest pending or expired job, or return None when none are left"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY from_block LIMIT 1", (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            if row["status"] == "leased":
+                logger.warning(f"Reclaiming expired lease on job {row['id']} from {row['owner']}")
+
+            token = uuid.uuid4().hex
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', owner = ?, lease_token = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?", (owner, token, now + ttl, row["id"]))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        job = dict(row)
+        job.update(status="leased", owner=owner, lease_token=token)
+        return job
+
+    def renew(self, job, ttl):
+        """Extend our lease; False means it was lost to another worker"""
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_token = ? AND status = 'leased'",
+            (time.time() + ttl, job["id"], job["lease_token"]))
+        return cur.rowcount == 1
+
+    def release(self, job):
+        """Give a job back without results so another worker can take it"""
+        self.conn.execute(
+            "UPDATE jobs SET status = 'pending', owner = NULL, lease_token = NULL, lease_expires = NULL "
+            "WHERE id = ? AND lease_token = ? AND status = 'leased'", (job["id"], job["lease_token"]))
+
+    def complete(self, job, events_by_pool):
+        """Store a job's logs and mark it done atomically, if we still hold its lease"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'", (job["id"], job["lease_token"]))
+            if cur.rowcount != 1:
+                self.conn.execute("ROLLBACK")
+                return False
+
+            self.conn.execute("DELETE FROM job_logs WHERE job_id = ?", (job["id"],))
+            for pool_id, logs in events_by_pool.items():
+                records = [compact_log(log) for log in logs]
+                self.conn.executemany(
+                    "INSERT INTO job_logs (job_id, pool_id, block_number, log_index, record) VALUES (?, ?, ?, ?, ?)",
+                    [(job["id"], pool_id, r["blockNumber"], r["logIndex"], json.dumps(r, separators=(",", ":")))
+                     for r in records])
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def status(self):
+        """Job counts per network and status"""
+        rows = self.conn.execute(
+            "SELECT network, status, COUNT(*) AS jobs, SUM(to_block - from_block + 1) AS blocks "
+            "FROM jobs GROUP BY network, status ORDER BY network, status").fetchall()
+        return [dict(row) for row in rows]
+
+    def finished_logs(self):
+        """Yield (pool_id, [records]) for everything committed by finished jobs"""
+        pool_ids = [row[0] for row in self.conn.execute("SELECT DISTINCT pool_id FROM job_logs")]
+        for pool_id in pool_ids:
+            rows = self.conn.execute(
+                "SELECT record FROM job_logs WHERE pool_id = ? ORDER BY block_number, log_index", (pool_id,))
+            yield pool_id, [json.loads(row[0]) for row in rows]
+
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseRenewer(threading.Thread):
+    """Renew a job's lease every ttl/3 seconds from its own thread
+
+    Runs independently of the event loop, so a fetch stuck in a blocking
+    call cannot let the lease lapse. If the lease is lost the fetch task is
+    cancelled on its loop.
+    """
+
+    def __init__(self, db_path, job, ttl, fetch_task, loop):
+        super().__init__(name=f"lease-{job['id']}", daemon=True)
+        self.db_path = db_path
+        self.job = job
+        self.ttl = ttl
+        self.fetch_task = fetch_task
+        self.loop = loop
+        self.stopped = threading.Event()
+
+    def run(self):
+        # sqlite connections belong to the thread that opened them
+        table = LeaseTable(self.db_path)
+        try:
+            while not self.stopped.wait(self.ttl / 3):
+                if not table.renew(self.job, self.ttl):
+                    logger.warning(f"Lost lease on job {self.job['id']}, abandoning it")
+                    self.job["lost"] = True
+                    self.loop.call_soon_threadsafe(self.fetch_task.cancel)
+                    return
+        finally:
+            table.conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+async def run_worker(db_path=LEASE_DB, owner=None, ttl=300):
+    """Claim and process jobs until none are left; returns the number completed"""
+    owner = owner or default_owner()
+    table = LeaseTable(db_path)
+    analytics = WBANAnalytics()
+    completed = 0
+
+    try:
+        while True:
+            job = table.claim(owner, ttl)
+            if job is None:
+                logger.info(f"{owner}: no jobs left, {completed} completed")
+                return completed
+
+            logger.info(f"{owner}: job {job['id']} {job['network']} blocks {job['from_block']:,}-{job['to_block']:,}")
+            fetch_task = asyncio.ensure_future(
+                analytics.fetch_swap_events(job["network"], job["from_block"], job["to_block"], strict=True))
+            renewer = LeaseRenewer(db_path, job, ttl, fetch_task, asyncio.get_running_loop())
+            renewer.start()
+            try:
+                events_by_pool = await fetch_task
+            except asyncio.CancelledError:
+                if job.get("lost"):
+                    continue
+                raise
+            except Exception as e:
+                logger.error(f"{owner}: job {job['id']} failed: {e}")
+                table.release(job)
+                continue
+            finally:
+                renewer.stop()
+
+            if table.complete(job, events_by_pool):
+                completed += 1
+            else:
+                logger.warning(f"{owner}: job {job['id']} was reclaimed before we finished, discarding results")
+    finally:
+        await analytics.aclose()
+
+
+def collect(db_path=LEASE_DB):
+    """Merge the logs of finished jobs into the per-pool swap log files"""
+    table = LeaseTable(db_path)
+    for pool_id, records in table.finished_logs():
+        save_swap_logs(pool_id, records)
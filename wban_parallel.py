@@ -0,0 +1,116 @@
+"""
+Re-aggregate stored swap logs on a process pool
+Run with: python wbanalytics.py reaggregate [--workers N] [--partitions P]
+
+Each chain's log file (see SWAP_LOG_DIR) is split into byte ranges aligned
+to line boundaries. Workers decode their range and send back only compact
+per-window aggregates (totals plus top-trader sketches), which are merged
+per chain.
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from wban_analytics import (
+    CHAINS, SWAP_LOG_DIR, WBANAnalytics, WindowAggregate, aggregate_swaps, chain_head_timestamp,
+    pool_window_results, save_data, swap_log_path, window_start_blocks,
+)
+from wban_prices import StaticPriceSource
+from wban_rollups import update_rollups
+
+logger = logging.getLogger("wBAN_parallel")
+
+
+def plan_shards(results, partitions):
+    """Split every stored chain log into up to `partitions` byte ranges"""
+    shards = []
+    for chain_id, chain_data in results.get("chains", {}).items():
+        path = swap_log_path(chain_id)
+        if chain_id not in CHAINS or not os.path.exists(path):
+            continue
+
+        config = CHAINS[chain_id]
+        current_block = chain_data["current_block"]
+        from_block_1m, from_block_3m = window_start_blocks(config, current_block)
+
+        size = os.path.getsize(path)
+        step = max(size // partitions, 1)
+        for start in range(0, size, step):
+            shards.append((
+                chain_id, path, start, min(start + step, size),
+                from_block_1m, from_block_3m, current_block, config["wban_is_token0"],
+                (current_block, chain_head_timestamp(results, chain_data), config["block_time"]),
+            ))
+    return shards
+
+
+def _shard_logs(path, start, end):
+    """Yield the logs whose line starts inside [start, end)"""
+    with open(path, "rb") as f:
+        if start:
+            # The line straddling `start` belongs to the previous shard
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield json.loads(line)
+
+
+def aggregate_shard(shard):
+    """Aggregate one shard; returns (chain_id, {window: state})"""
+    chain_id, path, start, end, from_block_1m, from_block_3m, to_block, wban_is_token0, clock = shard
+    windows = aggregate_swaps(_shard_logs(path, start, end), wban_is_token0, from_block_1m, from_block_3m, to_block, clock)
+    return chain_id, {window: aggregate.to_state() for window, aggregate in windows.items()}
+
+
+def merge_partials(partials):
+    """Merge per-shard window aggregates into per-chain aggregates"""
+    merged = {}
+    for chain_id, states in partials:
+        chain_windows = merged.setdefault(chain_id, {})
+        for window, state in states.items():
+            aggregate = WindowAggregate.from_state(state)
+            if window in chain_windows:
+                chain_windows[window].merge(aggregate)
+            else:
+                chain_windows[window] = aggregate
+    return merged
+
+
+def reaggregate(workers=None, partitions=None):
+    """Recompute window aggregates for every chain from its stored logs
+
+    USD values use the stored price table, or the --price-source stand-in when one is given.
+    """
+    analytics = WBANAnalytics()
+    if isinstance(analytics.price_source, StaticPriceSource):
+        # Static prices make no network call and live only in memory, so fill the table from them
+        asyncio.run(analytics.refresh_price_table())
+        analytics.wban_price_usd = analytics.results["wban_price_usd"] = analytics.price_table.latest()
+    workers = workers or os.cpu_count() or 1
+    shards = plan_shards(analytics.results, partitions or workers * 4)
+    if not shards:
+        logger.warning(f"No stored swap logs found in {SWAP_LOG_DIR}")
+        return analytics.results
+
+    logger.info(f"Re-aggregating {len(shards)} shards on {workers} workers")
+    if workers == 1:
+        merged = merge_partials(map(aggregate_shard, shards))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            merged = merge_partials(pool.map(aggregate_shard, shards))
+
+    for chain_id, windows in merged.items():
+        chain_data = analytics.results["chains"][chain_id]
+        complete = chain_data["3_months"].get("complete", True)
+        chain_data.update(pool_window_results(windows, analytics.wban_price_usd, analytics.price_table))
+        chain_data["3_months"]["complete"] = complete
+
+    analytics.recalculate_totals()
+    save_data(analytics.results)
+    update_rollups(analytics.results)
+    return analytics.results
@@ -0,0 +1,181 @@
+"""
+Hourly wBAN/USD price history
+
+PriceTable keeps hourly closes in wban_prices.json and tops itself up from
+a price source on each run, fetching only the hours it is missing. Swap
+volume is valued per hour: each aggregate keeps its wBAN volume bucketed by
+hour, and value() prices those buckets with one sorted-array join
+(numpy.searchsorted when numpy is installed, bisect otherwise), using the
+last close at or before each hour.
+
+CoinEx serves at most KLINE_LIMIT candles per request, so a fresh table only
+reaches back about 41 days; older hours are valued at the earliest close
+until the table has grown to cover them.
+
+WBAN_PRICE_SOURCE (or --price-source) picks where prices come from:
+  coinex           the CoinEx market API (default)
+  stored           wban_prices.json as it is, never refreshed (default under
+                   --rpc-cache replay, so replayed runs value USD identically)
+  static:<price>   one fixed price for every hour
+  static:<file>    a JSON file holding a price or [[timestamp, close], ...]
+Static prices live in an in-memory table and never overwrite wban_prices.json.
+
+Quote tokens that are not stablecoins (QUOTE_MARKETS) get the same hourly
+table of their own USD closes, so cross-chain matching can price a
+WETH-quoted swap at the hour it happened.
+"""
+import json
+import logging
+import os
+import time
+from bisect import bisect_right
+
+logger = logging.getLogger("wBAN_prices")
+
+PRICE_FILE = "wban_prices.json"
+MARKET = "BANANOUSDT"
+INTERVAL = 3600
+KLINE_LIMIT = 1000
+QUOTE_MARKETS = {"WETH": "ETHUSDT"}
+
+
+def hour_of(timestamp):
+    return int(timestamp) - int(timestamp) % INTERVAL
+
+
+def quote_price_file(market):
+    return f"wban_prices_{market.lower()}.json"
+
+
+class CoinExPriceSource:
+    """Hourly candles from the CoinEx market API"""
+
+    url = "https://api.coinex.com/v1/market/kline"
+
+    def __init__(self, market=MARKET):
+        self.market = market
+
+    async def closes(self, limit):
+        """[(hour, close)] for the last `limit` hours, oldest first"""
+        import httpx
+
+        params = {"market": self.market, "type": "1hour", "limit": min(limit, KLINE_LIMIT)}
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(self.url, params=params)
+            response.raise_for_status()
+            body = response.json()
+        if body.get("code") != 0:
+            raise RuntimeError(f"CoinEx kline error {body.get('code')}: {body.get('message')}")
+        # [time, open, close, high, low, volume, amount, market]
+        return [(int(row[0]), float(row[2])) for row in body["data"]]
+
+
+class StaticPriceSource:
+    """Stand-in price source serving fixed closes, for offline runs and tests
+
+    `prices` is [(timestamp, close)] or a single price used for every hour.
+    """
+
+    def __init__(self, prices, now=None):
+        self.prices = prices
+        self.now = now
+
+    async def closes(self, limit):
+        now = hour_of(self.now if self.now is not None else time.time())
+        if isinstance(self.prices, (int, float)):
+            return [(now - i * INTERVAL, float(self.prices)) for i in reversed(range(limit))]
+        return [(hour_of(t), float(p)) for t, p in self.prices if t <= now][-limit:]
+
+
+def price_source(spec):
+    """Price source for a WBAN_PRICE_SOURCE value; None for 'stored' (use the table as it is)"""
+    name, _, argument = spec.partition(":")
+    if name == "coinex":
+        return CoinExPriceSource()
+    if name == "stored":
+        return None
+    if name == "static" and argument:
+        try:
+            return StaticPriceSource(float(argument))
+        except ValueError:
+            with open(argument, "r") as f:
+                return StaticPriceSource(json.load(f))
+    raise ValueError(f"Unknown price source {spec!r}, expected coinex, stored, static:<price> or static:<file>")
+
+
+class PriceTable:
+    def __init__(self, hours=None, closes=None, path=PRICE_FILE, market=MARKET):
+        self.hours = list(hours or [])
+        self.closes = list(closes or [])
+        self.path = path
+        self.market = market
+
+    def __len__(self):
+        return len(self.hours)
+
+    @classmethod
+    def load(cls, path=PRICE_FILE, market=MARKET):
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+            return cls(state["hours"], state["closes"], path, market)
+        except FileNotFoundError:
+            return cls(path=path, market=market)
+
+    def save(self):
+        if self.path is None:
+            return
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"market": self.market, "interval": INTERVAL, "hours": self.hours, "closes": self.closes}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def latest(self):
+        return self.closes[-1] if self.closes else None
+
+    def merge(self, points):
+        """Add or overwrite (hour, close) points, keeping the table sorted"""
+        merged = dict(zip(self.hours, self.closes))
+        merged.update((hour_of(t), p) for t, p in points)
+        self.hours = sorted(merged)
+        self.closes = [merged[h] for h in self.hours]
+
+    async def refresh(self, source, now=None):
+        """Fetch the hours missing since the last stored close (the last one is refetched, it may have moved)"""
+        now = hour_of(now if now is not None else time.time())
+        missing = (now - self.hours[-1]) // INTERVAL + 1 if self.hours else KLINE_LIMIT
+        if missing <= 0:
+            return 0
+        points = await source.closes(missing)
+        self.merge(points)
+        self.save()
+        logger.info(f"{self.market} price table: {len(points)} hourly closes fetched, {len(self.hours)} stored")
+        return len(points)
+
+    def price_at(self, timestamp):
+        """Close at or before timestamp (the earliest close for anything older), or None"""
+        if not self.hours:
+            return None
+        return self.closes[max(bisect_right(self.hours, timestamp) - 1, 0)]
+
+    def prices_at(self, timestamps):
+        """Close at or before each timestamp (the earliest close for anything older)"""
+        if not self.hours:
+            return [None for _ in timestamps]
+        try:
+            import numpy as np
+        except ImportError:
+            return [self.price_at(t) for t in timestamps]
+
+        index = np.searchsorted(np.asarray(self.hours), np.asarray(timestamps), side="right") - 1
+        return np.asarray(self.closes)[np.clip(index, 0, len(self.hours) - 1)].tolist()
+
+    def value(self, hours, volumes):
+        """USD value of wBAN volumes traded in the given hours"""
+        if not self.hours or not hours:
+            return 0.0
+        return sum(volume * price for volume, price in zip(volumes, self.prices_at(hours)))
+
+
+def load_quote_price_tables():
+    """{quote token: PriceTable of its hourly USD closes} for the QUOTE_MARKETS tokens"""
+    return {token: PriceTable.load(quote_price_file(market), market) for token, market in QUOTE_MARKETS.items()}
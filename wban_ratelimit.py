@@ -0,0 +1,140 @@
+"""
+Per-host rate limiting for RPC requests
+
+One token bucket per provider host, shared by every network and pool that
+uses it (bsc and bsc_usdc both hit bsc.drpc.org, 1rpc.io serves several
+networks). The rate adapts AIMD-style: it creeps up on every success and
+halves on HTTP 429 / "rate limit" errors, and a Retry-After header blocks
+the host until then. Replaces the fixed sleeps between chunks.
+
+web3 requests are paced inside the RPC provider (wban_rpc_cache), so cache
+hits never wait; fetch_swap_events runs them in a worker thread, so that
+wait never blocks the event loop. Hedged requests are paced in wban_hedge.
+"""
+import asyncio
+import email.utils
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger("wBAN_ratelimit")
+
+INITIAL_RATE = 5.0    # requests/second for a host we know nothing about
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+RATE_STEP = 0.25      # added per successful request
+BURST = 5
+
+
+def host_key(url):
+    return urlparse(url).netloc.lower()
+
+
+class TokenBucket:
+    def __init__(self, host, rate=INITIAL_RATE, burst=BURST):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        # web3 requests take tokens from worker threads (asyncio.to_thread)
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self):
+        """Take a token if one is available, else return how long to wait"""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Wait until a request to this host is allowed"""
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        """acquire() for synchronous callers (web3 providers, run in a worker thread)"""
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(MAX_RATE, self.rate + RATE_STEP)
+
+    def on_throttled(self, retry_after=None):
+        with self.lock:
+            self.throttled += 1
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = 0.0
+            wait = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        logger.info(f"{self.host}: throttled, backing off {wait:.1f}s, rate now {self.rate:.2f}/s")
+
+
+_buckets = {}
+
+
+def get_bucket(url):
+    """The bucket shared by every request to url's host"""
+    host = host_key(url)
+    if host not in _buckets:
+        _buckets.setdefault(host, TokenBucket(host))
+    return _buckets[host]
+
+
+async def acquire(url):
+    await get_bucket(url).acquire()
+
+
+def acquire_blocking(url):
+    get_bucket(url).acquire_blocking()
+
+
+def parse_retry_after(value):
+    """Retry-After header (seconds or HTTP date) as seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def throttle_retry_after(exc):
+    """(throttled, retry_after) for an exception raised by a request"""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429:
+        return True, parse_retry_after(response.headers.get("Retry-After"))
+    message = str(exc).lower()
+    if "429" in message or "rate limit" in message or "too many requests" in message:
+        return True, None
+    return False, None
+
+
+def record_result(url, exc=None):
+    """Feed a request's outcome back into its host's bucket; True if it was throttled"""
+    bucket = get_bucket(url)
+    if exc is None:
+        bucket.on_success()
+        return False
+    throttled, retry_after = throttle_retry_after(exc)
+    if throttled:
+        bucket.on_throttled(retry_after)
+    return throttled
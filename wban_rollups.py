@@ -0,0 +1,156 @@
+"""
+Precomputed time-series rollups and downsampling for dashboard charts
+
+update_rollups() writes wban_rollups.json after each sync:
+  hourly swap count and wBAN volume per pool (from the stored swap logs)
+  a liquidity snapshot per pool per sync
+
+series() answers /api/series from that file: it slices a time range and
+downsamples it to the requested number of points with LTTB
+(Largest-Triangle-Three-Buckets), which keeps peaks and troughs that plain
+averaging would flatten.
+"""
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger("wBAN_rollups")
+
+ROLLUP_FILE = "wban_rollups.json"
+BUCKET_SECONDS = 3600
+MIN_POINTS = 3             # LTTB keeps the first and last point plus at least one in between
+METRICS = {"volume": "volume_wban", "swaps": "swap_count", "liquidity": "liquidity_usd"}
+
+
+def load_rollups(path=ROLLUP_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"bucket_seconds": BUCKET_SECONDS, "pools": {}}
+
+
+def hourly_activity(pool_id, head_block, head_timestamp):
+    """{"t", "swap_count", "volume_wban"} columns per hour from a pool's stored logs"""
+    from wban_analytics import CHAINS, decode_swap_volume, load_swap_logs, swap_timestamp
+
+    config = CHAINS[pool_id]
+    buckets = {}
+    for log in load_swap_logs(pool_id):
+        try:
+            volume = decode_swap_volume(log["data"], config["wban_is_token0"])
+        except Exception:
+            volume = 0
+        timestamp = swap_timestamp(log, head_block, head_timestamp, config["block_time"])
+        bucket = buckets.setdefault(timestamp - timestamp % BUCKET_SECONDS, [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += volume
+
+    hours = sorted(buckets)
+    return {
+        "t": hours,
+        "swap_count": [buckets[h][0] for h in hours],
+        "volume_wban": [buckets[h][1] for h in hours],
+    }
+
+
+def update_rollups(results, path=ROLLUP_FILE):
+    """Rebuild hourly activity and append a liquidity snapshot for every pool in results"""
+    from wban_analytics import chain_head_timestamp
+
+    rollups = load_rollups(path)
+    for pool_id, chain_data in results.get("chains", {}).items():
+        head_timestamp = chain_head_timestamp(results, chain_data)
+        pool = rollups["pools"].setdefault(pool_id, {})
+        pool["hourly"] = hourly_activity(pool_id, chain_data["current_block"], head_timestamp)
+
+        liquidity = pool.setdefault("liquidity", {"t": [], "wban": [], "liquidity_usd": []})
+        usd = chain_data.get("liquidity", {}).get("usd")
+        if usd is not None and (not liquidity["t"] or head_timestamp > liquidity["t"][-1]):
+            liquidity["t"].append(head_timestamp)
+            liquidity["wban"].append(chain_data["liquidity"]["wban"])
+            liquidity["liquidity_usd"].append(usd)
+
+    with open(path + ".tmp", "w") as f:
+        json.dump(rollups, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    return rollups
+
+
+def lttb(xs, ys, threshold):
+    """Downsample (xs, ys) to `threshold` points with Largest-Triangle-Three-Buckets"""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+
+    out_x, out_y = [xs[0]], [ys[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third corner of the triangle
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        count = max(next_end - next_start, 1)
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        best, best_area = start, -1.0
+        ax, ay = xs[a], ys[a]
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out_x.append(xs[best])
+        out_y.append(ys[best])
+        a = best
+
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def _pool_series(pool, metric):
+    column = METRICS[metric]
+    source = pool.get("liquidity" if metric == "liquidity" else "hourly", {})
+    return source.get("t", []), source.get(column, [])
+
+
+def series(rollups, chain="all", metric="volume", start=None, end=None, points=500):
+    """[[t, value], ...] for one pool or all pools, sliced to [start, end] and downsampled"""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {sorted(METRICS)}")
+    if points < MIN_POINTS:
+        # lttb() passes anything below 3 points through untouched
+        raise ValueError(f"points must be at least {MIN_POINTS}")
+    pools = rollups.get("pools", {})
+    if chain != "all" and chain not in pools:
+        raise KeyError(chain)
+
+    if chain == "all" and metric == "liquidity":
+        # Snapshots are taken per sync; sum each pool's latest value at or before every snapshot time
+        per_pool = [_pool_series(pool, metric) for pool in pools.values()]
+        times = sorted({t for ts, _ in per_pool for t in ts})
+        values = []
+        for t in times:
+            total = 0.0
+            for ts, vs in per_pool:
+                i = bisect_right(ts, t) - 1
+                total += vs[i] if i >= 0 else 0.0
+            values.append(total)
+    elif chain == "all":
+        summed = {}
+        for pool in pools.values():
+            for t, v in zip(*_pool_series(pool, metric)):
+                summed[t] = summed.get(t, 0) + v
+        times = sorted(summed)
+        values = [summed[t] for t in times]
+    else:
+        times, values = _pool_series(pools[chain], metric)
+
+    lo = bisect_left(times, start) if start is not None else 0
+    hi = bisect_right(times, end) if end is not None else len(times)
+    xs, ys = lttb(times[lo:hi], values[lo:hi], points)
+    return {"chain": chain, "metric": metric, "raw_points": hi - lo, "points": [[x, y] for x, y in zip(xs, ys)]}
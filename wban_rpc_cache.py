@@ -0,0 +1,175 @@
+"""
+Content-addressed cache for JSON-RPC responses
+
+Responses are stored on disk under a hash of (network, method, params).
+Modes (WBAN_RPC_CACHE or --rpc-cache):
+  off     always go to the network
+  cache   serve and store responses that cover finalized blocks only (default)
+  record  go to the network and store every response
+  replay  serve everything from the cache; a miss is an error
+
+Finality is judged against the latest eth_blockNumber seen on the network,
+less that network's `finality_blocks`, so logs near the head are refetched.
+Keys are exact params, so fetch_swap_events requests getLogs ranges on a
+fixed block grid (aligned_ranges) for finalized chunks to hit across runs.
+"""
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+
+logger = logging.getLogger("wBAN_rpc_cache")
+
+RPC_CACHE_DIR = "wban_rpc_cache"
+MODES = ("off", "cache", "record", "replay")
+
+
+class RPCCacheMiss(Exception):
+    pass
+
+
+def cache_key(network_id, method, params):
+    payload = json.dumps([network_id, method, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _block_number(value):
+    """Block tag as int, or None for 'latest'/'pending'/hashes"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith("0x") and len(value) <= 18:
+        return int(value, 16)
+    return None
+
+
+class RPCCache:
+    def __init__(self, network_id, mode="cache", directory=RPC_CACHE_DIR, finality_blocks=0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown RPC cache mode {mode!r}, expected one of {MODES}")
+        self.network_id = network_id
+        self.mode = mode
+        self.directory = directory
+        self.finality_blocks = finality_blocks
+        self.head = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, self.network_id, key[:2], f"{key}.json")
+
+    def is_finalized(self, method, params):
+        """True if the response can never change (a request pinned to finalized blocks)"""
+        if self.head is None:
+            return False
+        safe_block = self.head - self.finality_blocks
+        if method == "eth_getLogs":
+            to_block = _block_number(params[0].get("toBlock"))
+            return to_block is not None and to_block <= safe_block
+        if method in ("eth_getBlockByNumber", "eth_call"):
+            block = _block_number(params[0] if method == "eth_getBlockByNumber" else params[-1])
+            return block is not None and block <= safe_block
+        return method == "eth_chainId"
+
+    def get(self, method, params):
+        """Cached result, or None. In replay mode a miss raises RPCCacheMiss."""
+        if self.mode in ("off", "record"):
+            return None
+
+        try:
+            with open(self._path(cache_key(self.network_id, method, params)), "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+
+        if entry is not None and (self.mode == "replay" or entry["finalized"]):
+            self.hits += 1
+            self.observe(method, entry["result"])
+            return entry["result"]
+
+        self.misses += 1
+        if self.mode == "replay":
+            raise RPCCacheMiss(f"{self.network_id}: no cached response for {method} {params}")
+        return None
+
+    def observe(self, method, result):
+        """Track the chain head from eth_blockNumber responses"""
+        if method == "eth_blockNumber":
+            head = _block_number(result)
+            if head is not None and (self.head is None or head > self.head):
+                self.head = head
+
+    def put(self, method, params, result):
+        self.observe(method, result)
+        if self.mode in ("off", "replay"):
+            return
+
+        finalized = self.is_finalized(method, params)
+        if self.mode == "cache" and not finalized:
+            return
+
+        path = self._path(cache_key(self.network_id, method, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"method": method, "params": params, "finalized": finalized, "result": result}
+        with open(path + ".tmp", "w") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+
+@lru_cache(maxsize=None)
+def get_cache(network_id, mode, finality_blocks=0):
+    """One cache per network/mode, shared by every connection to that network"""
+    return RPCCache(network_id, mode, finality_blocks=finality_blocks)
+
+
+@lru_cache(maxsize=None)
+def _caching_provider_class():
+    from web3 import HTTPProvider
+
+    import wban_ratelimit as ratelimit
+
+    class CachingHTTPProvider(HTTPProvider):
+        """HTTPProvider that answers from / writes to an RPCCache
+
+        Requests that miss the cache are paced by the host's token bucket.
+        """
+
+        def __init__(self, endpoint_uri, rpc_cache, **kwargs):
+            super().__init__(endpoint_uri, **kwargs)
+            self.rpc_cache = rpc_cache
+
+        def make_request(self, method, params):
+            params = json.loads(json.dumps(params))  # tuples -> lists, stable key
+            if self.rpc_cache is not None:
+                result = self.rpc_cache.get(method, params)
+                if result is not None:
+                    return {"jsonrpc": "2.0", "id": 0, "result": result}
+
+            url = str(self.endpoint_uri)
+            ratelimit.acquire_blocking(url)
+            try:
+                response = super().make_request(method, params)
+            except Exception as e:
+                ratelimit.record_result(url, e)
+                raise
+            error = response.get("error")
+            ratelimit.record_result(url, Exception(str(error)) if error else None)
+
+            if self.rpc_cache is not None and response.get("result") is not None and not error:
+                self.rpc_cache.put(method, params, response["result"])
+            return response
+
+    return CachingHTTPProvider
+
+
+def make_provider(rpc_url, rpc_cache, request_kwargs=None):
+    """Web3 HTTP provider for rpc_url, going through rpc_cache unless it is off
+
+    web3's own retries are turned off: they would hit a throttled host again
+    before its token bucket hears about the 429, and multiply every refused
+    range during bisection. The bucket and fetch_swap_events own retry policy.
+    """
+    if rpc_cache is not None and rpc_cache.mode == "off":
+        rpc_cache = None
+    return _caching_provider_class()(rpc_url, rpc_cache, request_kwargs=request_kwargs,
+                                     exception_retry_configuration=None)
@@ -0,0 +1,192 @@
+"""
+Bounded-memory streaming summaries
+
+SpaceSaving keeps the heaviest keys (top traders) of a weighted stream in
+a fixed number of counters. Every summary here can be merged with another
+of its kind and round-trips through to_state()/from_state() as plain JSON,
+so summaries from different shards, pools or runs can be combined.
+"""
+import heapq
+
+
+class SpaceSaving:
+    """Top-k heavy hitters of a weighted stream in `capacity` counters
+
+    A key's reported weight overestimates its true weight by at most its
+    `error`; any key whose true weight exceeds the smallest counter is
+    guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counters = {}   # key -> [weight, error]
+        self._heap = []      # (weight, key), lazily refreshed
+
+    def __len__(self):
+        return len(self.counters)
+
+    def min_weight(self):
+        if len(self.counters) < self.capacity:
+            return 0.0
+        while True:
+            weight, key = self._heap[0]
+            current = self.counters.get(key)
+            if current is not None and current[0] == weight:
+                return weight
+            heapq.heappop(self._heap)
+            if current is not None:
+                heapq.heappush(self._heap, (current[0], key))
+
+    def add(self, key, weight=1.0):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0.0]
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        # Replace the smallest counter; its weight becomes the new key's error
+        floor = self.min_weight()
+        _, evicted = heapq.heappop(self._heap)
+        del self.counters[evicted]
+        self.counters[key] = [floor + weight, floor]
+        heapq.heappush(self._heap, (floor + weight, key))
+
+    def merge(self, other):
+        """Combine with another summary; keys missing from a full side get its floor as error"""
+        floor_self, floor_other = self.min_weight(), other.min_weight()
+        combined = {}
+        for key in set(self.counters) | set(other.counters):
+            weight_a, error_a = self.counters.get(key, (floor_self, floor_self))
+            weight_b, error_b = other.counters.get(key, (floor_other, floor_other))
+            combined[key] = [weight_a + weight_b, error_a + error_b]
+
+        kept = heapq.nlargest(self.capacity, combined.items(), key=lambda item: item[1][0])
+        self.counters = {key: counter for key, counter in kept}
+        self._heap = [(counter[0], key) for key, counter in kept]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, n):
+        """[(key, weight, error)] for the n heaviest keys"""
+        ranked = heapq.nlargest(n, self.counters.items(), key=lambda item: item[1][0])
+        return [(key, weight, error) for key, (weight, error) in ranked]
+
+    def to_state(self):
+        return {"capacity": self.capacity, "counters": [[k, w, e] for k, (w, e) in self.counters.items()]}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["capacity"])
+        sketch.counters = {k: [w, e] for k, w, e in state["counters"]}
+        sketch._heap = [(w, k) for k, (w, _) in sketch.counters.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty 2016)
+
+    Items are kept in levels of compactors; an item at level h stands for
+    2**h inputs. A full level is sorted and every other item is promoted,
+    so memory stays around 3k items for any stream length with rank error
+    of roughly 1/k. Compaction offsets alternate instead of being random so
+    results are reproducible.
+    """
+
+    def __init__(self, k=128, c=2 / 3):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.compactors = [[]]
+        self._offset = 0
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(self.k * self.c ** depth) + 2
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _size(self):
+        return sum(len(items) for items in self.compactors)
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    items.sort()
+                    # With an odd count the smallest item stays behind so weight is preserved
+                    keep = items[:len(items) % 2]
+                    self.compactors[level + 1].extend(items[len(keep) + self._offset::2])
+                    self._offset ^= 1
+                    self.compactors[level] = keep
+                    break
+
+    def add(self, value):
+        self.count += 1
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+        self.compactors[0].append(value)
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate values at each fraction in qs (None when empty)"""
+        if self.count == 0:
+            return [None for _ in qs]
+        weighted = sorted((value, 2 ** level) for level, items in enumerate(self.compactors) for value in items)
+        total = sum(weight for _, weight in weighted)
+
+        results = []
+        for q in qs:
+            if q <= 0:
+                results.append(self.min)
+                continue
+            if q >= 1:
+                results.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+        return results
+
+    def to_state(self):
+        return {
+            "k": self.k, "count": self.count, "min": self.min, "max": self.max,
+            "offset": self._offset, "compactors": self.compactors,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["k"])
+        sketch.count = state["count"]
+        sketch.min = state["min"]
+        sketch.max = state["max"]
+        sketch._offset = state["offset"]
+        sketch.compactors = [list(items) for items in state["compactors"]]
+        return sketch
@@ -0,0 +1,322 @@
+"""
+wBAN Analytics command line
+Run with: python wbanalytics.py <command> [options]
+
+Commands:
+  fetch     scan chains and update wban_analytics_data.json
+  tail      keep refreshing the data file every --interval seconds
+  summary   print a summary of the saved data
+  serve     run the dashboard
+  export    write the saved data as CSV or JSON, or swap history as Arrow/Parquet
+  reaggregate  recompute window totals from stored swap logs on a process pool
+  queue     plan/work/status/collect block-range jobs shared by several workers
+  arbitrage match opposite swaps across chains and report price gaps
+  bench     time and measure decode/aggregate/persist/render on synthetic data
+
+Heavy dependencies (web3, httpx, flask) are imported inside the command that
+needs them, so summary/export and dashboard cold starts stay fast.
+Pass --timings to print startup and command time to stderr, and
+--rpc-cache off|cache|record|replay to choose how RPC responses are cached.
+--hedge sends slow getLogs chunks to a second endpoint as well.
+--price-source coinex|stored|static:<price or file> chooses where USD prices
+come from (replay runs default to the stored table).
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import os
+import sys
+
+
+def cmd_fetch(args):
+    import asyncio
+    from wban_analytics import WBANAnalytics, setup_logging
+
+    setup_logging()
+    analytics = WBANAnalytics()
+    asyncio.run(analytics.run_analysis(skip_existing=not args.refresh))
+
+
+def cmd_tail(args):
+    import asyncio
+    from wban_analytics import WBANAnalytics, setup_logging, logger
+
+    setup_logging()
+
+    async def follow():
+        while True:
+            analytics = WBANAnalytics()
+            await analytics.run_analysis(skip_existing=False)
+            logger.info(f"Next refresh in {args.interval}s")
+            await asyncio.sleep(args.interval)
+
+    try:
+        asyncio.run(follow())
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_summary(args):
+    from wban_analytics import WBANAnalytics
+
+    WBANAnalytics().print_summary()
+
+
+def cmd_serve(args):
+    import analytics_app
+
+    analytics_app.main(host=args.host, port=args.port)
+
+
+def cmd_reaggregate(args):
+    from wban_analytics import setup_logging
+    from wban_parallel import reaggregate
+
+    setup_logging()
+    reaggregate(workers=args.workers, partitions=args.partitions)
+
+
+def cmd_queue(args):
+    import asyncio
+    from wban_analytics import setup_logging
+    import wban_leases
+
+    setup_logging()
+    if args.action == "plan":
+        if args.network is None or args.from_block is None:
+            sys.exit("queue plan needs --network and --from-block")
+        to_block = args.to_block
+        if to_block is None:
+            from wban_analytics import WBANAnalytics
+
+            w3, _ = WBANAnalytics().get_working_web3(args.network)
+            if not w3:
+                sys.exit(f"Could not connect to {args.network}")
+            to_block = w3.eth.block_number
+        added = wban_leases.LeaseTable(args.db).plan(args.network, args.from_block, to_block, args.chunk)
+        print(f"Queued {added} jobs for {args.network} blocks {args.from_block:,}-{to_block:,}")
+    elif args.action == "work":
+        try:
+            asyncio.run(wban_leases.run_worker(args.db, owner=args.owner, ttl=args.ttl))
+        except KeyboardInterrupt:
+            pass
+    elif args.action == "status":
+        for row in wban_leases.LeaseTable(args.db).status():
+            print(f"{row['network']:<10} {row['status']:<8} {row['jobs']:>6} jobs {row['blocks']:>14,} blocks")
+    elif args.action == "collect":
+        wban_leases.collect(args.db)
+
+
+def cmd_arbitrage(args):
+    from wban_analytics import load_existing_data, save_data, setup_logging
+    from wban_arbitrage import find_arbitrage
+
+    setup_logging()
+    data = load_existing_data()
+    if not data:
+        sys.exit("No data. Run 'python wbanalytics.py fetch' first.")
+    report = find_arbitrage(data, window=args.window, tolerance=args.tolerance, top=args.top)
+    data["arbitrage"] = report
+    save_data(data)
+
+    print(f"{report['matched_pairs']:,} cross-chain pairs within {args.tolerance}s ({args.window})")
+    for route, stats in report["routes"].items():
+        print(f"  {route:<22} {stats['pairs']:>7,} pairs  gap {stats['mean_gap_pct']:+7.2f}%  "
+              f"lag {stats['mean_lag_seconds']:5.0f}s  {stats['volume_wban']:>14,.0f} wBAN  first: {stats['leader']}")
+    for pair in report["top_pairs"][:5]:
+        print(f"  {pair['gap_pct']:+.2f}%  buy {pair['buy_pool']} ${pair['buy_price_usd']:.6f} -> "
+              f"sell {pair['sell_pool']} ${pair['sell_price_usd']:.6f}  {pair['volume_wban']:,.0f} wBAN")
+
+
+def cmd_bench(args):
+    import logging
+    from wban_analytics import setup_logging
+    import wban_bench
+
+    setup_logging()
+    if not args.verbose:
+        # The stages log every save; keep the report readable
+        logging.getLogger().setLevel(logging.WARNING)
+    sizes = [wban_bench.parse_size(size) for size in args.sizes.split(",")]
+    stages = args.stages.split(",") if args.stages else wban_bench.STAGES
+    unknown = set(stages) - set(wban_bench.STAGES)
+    if unknown:
+        sys.exit(f"Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(wban_bench.STAGES)})")
+
+    report = wban_bench.run(sizes, stages, trace_memory=not args.no_memory)
+    baseline = wban_bench.load_baseline(args.baseline)
+    wban_bench.print_report(report, baseline)
+    if args.save_baseline:
+        wban_bench.save_baseline(report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = wban_bench.compare(report, baseline, args.tolerance)
+    for label, stage, metric, before, after in regressions:
+        print(f"REGRESSION {label} {stage} {metric}: {before:.4g} -> {after:.4g} ({after / before:.2f}x)")
+    if regressions:
+        sys.exit(1)
+
+
+EXPORT_COLUMNS = [
+    "chain", "name", "network", "lp_address", "current_block",
+    "liquidity_wban", "liquidity_quote_token", "liquidity_quote_amount", "liquidity_usd",
+    "swaps_1m", "volume_wban_1m", "volume_usd_1m",
+    "swaps_3m", "volume_wban_3m", "volume_usd_3m",
+]
+
+
+def export_rows(data):
+    """Flatten per-chain results into one row per chain"""
+    for chain_id, chain in data.get("chains", {}).items():
+        liquidity = chain.get("liquidity", {})
+        yield {
+            "chain": chain_id,
+            "name": chain.get("name"),
+            "network": chain.get("network"),
+            "lp_address": chain.get("lp_address"),
+            "current_block": chain.get("current_block"),
+            "liquidity_wban": liquidity.get("wban"),
+            "liquidity_quote_token": liquidity.get("quote_token"),
+            "liquidity_quote_amount": liquidity.get("quote_amount"),
+            "liquidity_usd": liquidity.get("usd"),
+            "swaps_1m": chain["1_month"]["swap_count"],
+            "volume_wban_1m": chain["1_month"]["volume_wban"],
+            "volume_usd_1m": chain["1_month"]["volume_usd"],
+            "swaps_3m": chain["3_months"]["swap_count"],
+            "volume_wban_3m": chain["3_months"]["volume_wban"],
+            "volume_usd_3m": chain["3_months"]["volume_usd"],
+        }
+
+
+def cmd_export(args):
+    import json
+    from wban_analytics import OUTPUT_FILE
+
+    try:
+        with open(OUTPUT_FILE, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        sys.exit("No data. Run 'python wbanalytics.py fetch' first.")
+
+    if args.format in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("Arrow/Parquet export needs pyarrow: pip install pyarrow")
+        from wban_analytics import setup_logging
+        from wban_columnar import EXPORT_DIR, export_columnar
+
+        setup_logging()
+        export_columnar(data, args.output or EXPORT_DIR, args.format, full=args.full)
+        return
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump(list(export_rows(data)), out, indent=2)
+            out.write("\n")
+        else:
+            import csv
+
+            writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(export_rows(data))
+    finally:
+        if args.output:
+            out.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wbanalytics", description="wBAN cross-chain analytics")
+    parser.add_argument("--timings", action="store_true", help="print startup and command time to stderr")
+    parser.add_argument("--rpc-cache", choices=["off", "cache", "record", "replay"], default=None,
+                        help="RPC response cache mode (default: $WBAN_RPC_CACHE or 'cache')")
+    parser.add_argument("--price-source", default=None,
+                        help="coinex, stored or static:<price or file> (default: $WBAN_PRICE_SOURCE, "
+                             "'stored' under --rpc-cache replay, else 'coinex')")
+    parser.add_argument("--hedge", action="store_true", help="hedge slow getLogs requests to a second RPC")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="scan chains and update the data file")
+    p.add_argument("--refresh", action="store_true", help="rescan chains that already have data")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("tail", help="keep refreshing the data file")
+    p.add_argument("--interval", type=int, default=300, help="seconds between refreshes")
+    p.set_defaults(func=cmd_tail)
+
+    p = sub.add_parser("summary", help="print a summary of the saved data")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("serve", help="run the dashboard")
+    p.add_argument("--host", default=None)
+    p.add_argument("--port", type=int, default=None)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("export", help="export the saved data")
+    p.add_argument("--format", choices=["csv", "json", "arrow", "parquet"], default="csv",
+                   help="csv/json: chain summary; arrow/parquet: partitioned swap history")
+    p.add_argument("--output", "-o", default=None,
+                   help="output file (default: stdout), or directory for arrow/parquet (default: wban_export)")
+    p.add_argument("--full", action="store_true", help="arrow/parquet: rewrite every partition")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("reaggregate", help="recompute window totals from stored swap logs")
+    p.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--partitions", type=int, default=None, help="shards to split the logs into (default: 4 per worker)")
+    p.set_defaults(func=cmd_reaggregate)
+
+    p = sub.add_parser("queue", help="coordinate block-range scans across workers")
+    p.add_argument("action", choices=["plan", "work", "status", "collect"])
+    p.add_argument("--db", default="wban_leases.db", help="shared lease table (SQLite file)")
+    p.add_argument("--network", default=None, help="network to plan jobs for")
+    p.add_argument("--from-block", type=int, default=None)
+    p.add_argument("--to-block", type=int, default=None, help="default: current head")
+    p.add_argument("--chunk", type=int, default=500000, help="blocks per job")
+    p.add_argument("--ttl", type=int, default=300, help="lease duration in seconds")
+    p.add_argument("--owner", default=None, help="worker name (default: host:pid)")
+    p.set_defaults(func=cmd_queue)
+
+    p = sub.add_parser("arbitrage", help="match opposite swaps across chains")
+    p.add_argument("--window", choices=["1_month", "3_months"], default="3_months")
+    p.add_argument("--tolerance", type=int, default=120, help="max seconds between matched swaps")
+    p.add_argument("--top", type=int, default=20, help="largest gaps to keep")
+    p.set_defaults(func=cmd_arbitrage)
+
+    p = sub.add_parser("bench", help="benchmark the non-network hot paths")
+    p.add_argument("--sizes", default="1k,10k,100k", help="comma-separated swap counts, e.g. 1k,1M,10M")
+    p.add_argument("--stages", default=None, help="comma-separated subset of stages (default: all)")
+    p.add_argument("--baseline", default="wban_bench_baseline.json", help="baseline file to compare against")
+    p.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth before flagging")
+    p.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run (faster for large sizes)")
+    p.add_argument("--verbose", action="store_true", help="keep INFO logging from the stages")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.rpc_cache:
+        os.environ["WBAN_RPC_CACHE"] = args.rpc_cache
+    if args.price_source:
+        os.environ["WBAN_PRICE_SOURCE"] = args.price_source
+    if args.hedge:
+        os.environ["WBAN_HEDGE"] = "1"
+    if args.timings:
+        print(f"startup: {(time.perf_counter() - _STARTED) * 1000:.1f} ms", file=sys.stderr)
+
+    command_started = time.perf_counter()
+    try:
+        args.func(args)
+    finally:
+        if args.timings:
+            print(f"{args.command}: {(time.perf_counter() - command_started) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()